@@ -0,0 +1,70 @@
+"""History benchmark: dashboard queries over a year of recorded runs.
+
+Records `--days` of runs (with per-rule violation counts) into a temporary
+HistoryStore, then times the 12-month trend, regression and top-degraded-rule
+queries the dashboard runs on every page load.
+
+Usage:
+    python benchmarks/history_benchmark.py [--days 365] [--runs-per-day 1] [--rules 200]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.history_store import HistoryStore  # noqa: E402
+from utils.kpi_analyzer import KPIAnalyzer  # noqa: E402
+from utils.rule_model import RuleSet  # noqa: E402
+
+
+def build_rules(count):
+    return RuleSet.from_dict({"validity": [
+        {"rule": f"Rule {index}", "columns": [f"column_{index % 40}"], "type": "range",
+         "pseudo_sql": f"SELECT * FROM table_name WHERE column_{index % 40} < 0"}
+        for index in range(count)
+    ]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--runs-per-day", type=int, default=1)
+    parser.add_argument("--rules", type=int, default=200)
+    args = parser.parse_args()
+
+    rules = build_rules(args.rules)
+    kpi_analyzer = KPIAnalyzer()
+    kpi_analyzer.analyze_rules(rules)
+    rng = np.random.default_rng(0)
+    root = tempfile.mkdtemp(prefix="dq_history_bench_")
+    try:
+        store = HistoryStore(root)
+        now = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        for day in range(args.days, 0, -1):
+            for run in range(args.runs_per_day):
+                counts = dict(zip((rule.rule_id for rule in rules), rng.poisson(50, args.rules).tolist()))
+                store.record_run("benchmark", kpi_analyzer, counts, rules,
+                                 timestamp=now - timedelta(days=day, minutes=run))
+        print(f"recorded {args.days * args.runs_per_day} runs x {args.rules} rules "
+              f"in {time.perf_counter() - start:.2f}s")
+
+        for name, query in (("trend (12 months)", lambda: store.trend("benchmark")),
+                            ("regressions", lambda: store.regressions("benchmark")),
+                            ("top degraded rules", lambda: store.top_degraded_rules("benchmark"))):
+            start = time.perf_counter()
+            query()
+            print(f"{name:<22}{time.perf_counter() - start:>8.3f}s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
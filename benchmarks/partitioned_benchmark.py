@@ -0,0 +1,98 @@
+"""Partitioned execution benchmark: rule throughput as worker processes are added.
+
+Builds a synthetic table and a rule set with row filters and duplicate
+checks, then runs it through PartitionedExecutor with increasing worker
+counts (a local process pool, or local socket workers with --socket) and
+reports wall time, rows per second and speedup over one worker.
+
+Usage:
+    python benchmarks/partitioned_benchmark.py [--rows 2000000] [--workers 1 2 4 8] [--socket]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.partitioned_executor import PartitionedExecutor  # noqa: E402
+from utils.rule_model import RuleSet  # noqa: E402
+
+
+def build_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": rng.integers(0, rows, rows),
+        "age": rng.integers(-5, 130, rows),
+        "amount": rng.lognormal(3, 1, rows),
+        "email": np.where(rng.random(rows) < 0.02, None, "user@example.com")
+    })
+
+
+RULES = RuleSet.from_dict({
+    "validity": [{"rule": "Age is between 0 and 120", "columns": ["age"], "type": "range",
+                  "pseudo_sql": "SELECT * FROM table_name WHERE age < 0 OR age > 120"}],
+    "accuracy": [{"rule": "Amounts are positive", "columns": ["amount"], "type": "range",
+                  "pseudo_sql": "SELECT * FROM table_name WHERE amount <= 0"}],
+    "completeness": [{"rule": "Email is present", "columns": ["email"], "type": "null_check",
+                      "pseudo_sql": "SELECT * FROM table_name WHERE email IS NULL"}],
+    "uniqueness": [{"rule": "Id is unique", "columns": ["id"], "type": "unique",
+                    "pseudo_sql": "SELECT id, COUNT(*) as count FROM table_name GROUP BY id HAVING COUNT(*) > 1"}]
+})
+
+
+def start_socket_workers(count):
+    processes, nodes = [], []
+    for _ in range(count):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        processes.append(subprocess.Popen([sys.executable, "-m", "utils.partitioned_executor", "--serve",
+                                           "--port", str(port)], cwd=ROOT))
+        nodes.append(("127.0.0.1", port))
+    for node in nodes:
+        for _ in range(100):
+            try:
+                socket.create_connection(node).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+    return processes, nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--socket", action="store_true", help="use local socket workers instead of a process pool")
+    args = parser.parse_args()
+
+    df = build_frame(args.rows)
+    print(f"{args.rows} rows, {len(RULES)} rules, {os.cpu_count()} CPUs, "
+          f"{'socket workers' if args.socket else 'process pool'}")
+    print(f"{'workers':<10}{'seconds':>10}{'rows/s':>14}{'speedup':>10}")
+
+    baseline = None
+    for workers in args.workers:
+        processes, nodes = start_socket_workers(workers) if args.socket else ([], None)
+        try:
+            start = time.perf_counter()
+            results = PartitionedExecutor(df, max_workers=workers, nodes=nodes).run(RULES)
+            elapsed = time.perf_counter() - start
+        finally:
+            for process in processes:
+                process.kill()
+        assert results["row_count"] == args.rows
+        baseline = baseline or elapsed
+        print(f"{workers:<10}{elapsed:>10.2f}{args.rows / elapsed:>14,.0f}{baseline / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Profiling benchmark: parallel column profiling speedup over the serial path.
+
+Builds a synthetic wide table (numeric, text and date columns), profiles it
+serially and with ParallelProfiler at increasing worker counts, and reports
+wall time and speedup for each.
+
+Usage:
+    python benchmarks/profiling_benchmark.py [--rows 200000] [--columns 256] [--workers 2 4 8]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_analyzer import DataAnalyzer  # noqa: E402
+from utils.parallel_profiler import ParallelProfiler  # noqa: E402
+
+
+def build_frame(rows, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for index in range(columns):
+        kind = index % 4
+        if kind == 0:
+            data[f"amount_{index}"] = rng.lognormal(3, 1, rows)
+        elif kind == 1:
+            data[f"count_{index}"] = rng.integers(0, 1000, rows)
+        elif kind == 2:
+            data[f"code_{index}"] = rng.choice([f"C{code:03d}" for code in range(200)], rows)
+        else:
+            data[f"date_{index}"] = (pd.Timestamp("2020-01-01")
+                                     + pd.to_timedelta(rng.integers(0, 1500, rows), unit="D")).astype(str)
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--columns", type=int, default=256)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({2, 4, os.cpu_count() or 1} - {1}))
+    args = parser.parse_args()
+
+    df = build_frame(args.rows, args.columns)
+    print(f"{args.rows} rows x {args.columns} columns, {os.cpu_count()} CPUs")
+
+    start = time.perf_counter()
+    serial_profiles = DataAnalyzer(df).generate_column_profiles()
+    serial = time.perf_counter() - start
+    print(f"{'backend':<14}{'seconds':>10}{'speedup':>10}")
+    print(f"{'serial':<14}{serial:>10.2f}{1.0:>10.2f}")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        profiles = ParallelProfiler(df, max_workers=workers).generate_column_profiles()
+        elapsed = time.perf_counter() - start
+        assert list(profiles) == list(serial_profiles)
+        print(f"{f'{workers} workers':<14}{elapsed:>10.2f}{serial / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Schema index benchmark: LSH lookups among tens of thousands of stored schemas.
+
+Stores `--schemas` synthetic schemas (columns drawn from a shared pool of
+names, with random value signatures) in a temporary SchemaIndex, reopens it,
+then looks up perturbed copies of stored schemas (one column renamed, one
+added) and unrelated schemas, timing the nearest-signature search and the full
+lookup (which also reads and remaps the matched rule set).
+
+Usage:
+    python benchmarks/schema_index_benchmark.py [--schemas 20000] [--columns 20] [--queries 1000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.schema_index import VALUE_PERM, SchemaIndex, SchemaSignature, normalize_name  # noqa: E402
+
+TYPES = ["integer", "float", "string", "date", "boolean"]
+
+
+def random_column(rng, name):
+    return {
+        "name": name,
+        "key": normalize_name(name),
+        "type": TYPES[int(rng.integers(len(TYPES)))],
+        "values": rng.integers(0, 2 ** 63, VALUE_PERM, dtype=np.uint64)
+    }
+
+
+def random_schema(rng, pool, columns):
+    return [random_column(rng, name) for name in rng.choice(pool, columns, replace=False)]
+
+
+def rules_for(columns):
+    return {"completeness": [
+        {"rule": f"{column['name']} must not be null", "columns": [column["name"]], "type": "null_check",
+         "pseudo_sql": f"SELECT * FROM table_name WHERE {column['name']} IS NULL"}
+        for column in columns
+    ]}
+
+
+def percentiles(timings):
+    timings = np.array(timings) * 1000
+    return f"median {np.median(timings):.3f}ms  p99 {np.percentile(timings, 99):.3f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schemas", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pool = [f"field_{index}" for index in range(2000)]
+    root = tempfile.mkdtemp(prefix="dq_schema_index_bench_")
+    try:
+        index = SchemaIndex(root)
+        stored = []
+        start = time.perf_counter()
+        for _ in range(args.schemas):
+            columns = random_schema(rng, pool, args.columns)
+            index.add(SchemaSignature.from_columns(columns), rules_for(columns))
+            stored.append(columns)
+        print(f"stored {args.schemas} schemas x {args.columns} columns in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        index = SchemaIndex(root)
+        print(f"reopened index in {time.perf_counter() - start:.2f}s")
+
+        near, unrelated = [], []
+        for query in range(args.queries):
+            position = int(rng.integers(len(stored)))
+            columns = [dict(column) for column in stored[position]]
+            columns[0]["name"] = columns[0]["key"] = f"renamed_{query}"
+            columns.append(random_column(rng, f"added_{query}"))
+            near.append((position, SchemaSignature.from_columns(columns)))
+            unrelated.append(SchemaSignature.from_columns(random_schema(rng, [f"other_{i}" for i in range(500)],
+                                                                        args.columns)))
+
+        timings, hits = [], 0
+        for position, signature in near:
+            start = time.perf_counter()
+            nearest = index.nearest(signature)
+            timings.append(time.perf_counter() - start)
+            hits += nearest is not None and nearest[0] == position
+        print(f"{'nearest (near copy)':<24}{percentiles(timings)}  found {hits}/{len(near)}")
+
+        timings = []
+        for _, signature in near:
+            start = time.perf_counter()
+            index.lookup(signature)
+            timings.append(time.perf_counter() - start)
+        print(f"{'lookup + remap':<24}{percentiles(timings)}")
+
+        timings, false_matches = [], 0
+        for signature in unrelated:
+            start = time.perf_counter()
+            false_matches += index.lookup(signature) is not None
+            timings.append(time.perf_counter() - start)
+        print(f"{'lookup (unrelated)':<24}{percentiles(timings)}  matched {false_matches}/{len(unrelated)}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Startup benchmark: measure cold import time per module against a budget.
+
+Each module is imported in a fresh interpreter so nothing is shared through
+sys.modules, and the median of several runs is compared with its budget.
+Modules that are meant to stay lightweight are also checked for heavy
+dependencies leaking into their import.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5] [--scale 1.0]
+
+Exits with status 1 when any module is over budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "numpy", "openai", "plotly", "dateutil", "pyarrow"]
+
+# module -> (budget in seconds, heavy modules it must not import)
+BUDGETS = {
+    "utils.kpi_analyzer": (0.05, HEAVY_MODULES),
+    "utils.rule_generator": (0.05, HEAVY_MODULES),
+    "utils.openai_helper": (0.05, HEAVY_MODULES),
+    "utils.rule_executor": (0.05, HEAVY_MODULES),
+    "utils.violation_exporter": (0.05, HEAVY_MODULES),
+    "utils.history_store": (0.05, HEAVY_MODULES),
+    "utils.sample_validator": (0.05, HEAVY_MODULES),
+    "utils.partitioned_executor": (0.05, HEAVY_MODULES),
+    "utils.data_analyzer": (1.5, ["openai", "plotly"]),
+    "main": (2.0, ["pandas", "openai", "plotly"]),
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "leaked": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, heavy, runs):
+    timings = []
+    leaked = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=heavy)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(sample["elapsed"])
+        leaked.update(sample["leaked"])
+    return statistics.median(timings), sorted(leaked)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow CI machines)")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<28}{'median (ms)':>14}{'budget (ms)':>14}  status")
+    for module, (budget, heavy) in BUDGETS.items():
+        budget *= args.scale
+        elapsed, leaked = measure(module, heavy, args.runs)
+        status = "ok"
+        if elapsed > budget:
+            status = "OVER BUDGET"
+        if leaked:
+            status = f"imports {', '.join(leaked)}"
+        if status != "ok":
+            failures.append(module)
+        print(f"{module:<28}{elapsed * 1000:>14.1f}{budget * 1000:>14.1f}  {status}")
+
+    if failures:
+        print(f"\n{len(failures)} module(s) failed the startup budget: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
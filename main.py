@@ -1,17 +1,76 @@
 import streamlit as st
-import pandas as pd
-from utils.data_analyzer import DataAnalyzer
-from utils.openai_helper import OpenAIHelper
-from utils.rule_generator import RuleGenerator
-from utils.kpi_analyzer import KPIAnalyzer
-import json
+import os
+import shutil
+import tempfile
 from datetime import datetime
-from dotenv import load_dotenv
-import plotly.express as px
-import plotly.graph_objects as go
 
-# Load environment variables from .env file
-load_dotenv()
+# pandas, plotly, openai and the analyzers are imported inside main() where they
+# are first needed, so a cold start only pays for Streamlit itself.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# Download buttons hold their data in memory; larger violation exports stay on disk
+MAX_DOWNLOAD_BYTES = 200 * 1024 * 1024
+
+
+@st.cache_resource
+def load_environment():
+    """Load environment variables from .env file once per server process"""
+    from dotenv import load_dotenv
+    return load_dotenv()
+
+
+@st.cache_resource
+def load_css():
+    """Read the app stylesheet once per server process"""
+    with open(os.path.join(STATIC_DIR, "style.css"), encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+
+@st.cache_resource
+def load_schema_index():
+    """Open the index of earlier rule sets once per server process"""
+    from utils.schema_index import SchemaIndex
+    return SchemaIndex()
+
+
+RULE_WIDGET_PREFIXES = ("rule_accept_", "rule_text_", "rule_sql_")
+
+
+def reset_rule_curation():
+    """Forget accept/reject and edit state from a previous generation"""
+    st.session_state["rejected_rules"] = set()
+    st.session_state.pop("kpi_analyzer", None)
+    st.session_state.pop("failure_bitmaps", None)
+    st.session_state.pop("sample_estimates", None)
+    st.session_state.pop("full_validation", None)
+    for key in [key for key in st.session_state if str(key).startswith(RULE_WIDGET_PREFIXES)]:
+        del st.session_state[key]
+
+
+def toggle_rule(rule_id):
+    """Accept or reject one rule; only that rule's KPI contribution changes"""
+    kpi_analyzer = st.session_state["kpi_analyzer"]
+    if st.session_state[f"rule_accept_{rule_id}"]:
+        st.session_state["rejected_rules"].discard(rule_id)
+        kpi_analyzer.add_rule(st.session_state["rules"].get(rule_id))
+    else:
+        st.session_state["rejected_rules"].add(rule_id)
+        kpi_analyzer.remove_rule(rule_id)
+
+
+def save_rule_edit(rule_id):
+    """Store an edited rule description/SQL and update its KPIs if it is accepted"""
+    rules = st.session_state["rules"]
+    rule = rules.get(rule_id).edited(
+        text=st.session_state[f"rule_text_{rule_id}"],
+        pseudo_sql=st.session_state[f"rule_sql_{rule_id}"]
+    )
+    rules.replace(rule)
+    if rule_id in st.session_state["kpi_analyzer"]:
+        st.session_state["kpi_analyzer"].update_rule(rule)
+
+
+load_environment()
 
 # Page configuration
 st.set_page_config(
@@ -21,144 +80,7 @@ st.set_page_config(
 )
 
 # Custom CSS for white backgrounds and typography
-st.markdown("""
-<style>
-/* Import modern sans-serif fonts */
-@import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Roboto:wght@300;400;500;700&display=swap');
-
-/* Global typography - apply to all elements */
-* {
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-/* Main content typography */
-.main .block-container {
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-/* Headers */
-h1, h2, h3, h4, h5, h6 {
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-    font-weight: 600 !important;
-}
-
-/* File uploader styling - comprehensive coverage */
-.stFileUploader {
-    background-color: white !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-.stFileUploader > div {
-    background-color: white !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-.stFileUploader > div > div {
-    background-color: white !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-.stFileUploader > div > div > div {
-    background-color: white !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-.stFileUploader > div > div > div > div {
-    background-color: white !important;
-    border: 2px dashed #ccc !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-.stFileUploader > div > div > div > div > div {
-    background-color: white !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-.stFileUploader > div > div > div > div > div > div {
-    background-color: white !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-/* Browse files button */
-.stFileUploader > div > div > div > div > button {
-    background-color: white !important;
-    color: black !important;
-    border: 1px solid #ccc !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-    font-weight: 500 !important;
-}
-
-/* Uploaded file display */
-.stFileUploader > div > div > div > div > div > div {
-    background-color: white !important;
-    border: 1px solid #ccc !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-/* File uploader help text */
-.stFileUploader > div > div > div > div > small {
-    background-color: white !important;
-    color: #666 !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-/* Text area styling */
-.stTextArea > div > div > textarea {
-    background-color: white !important;
-    border: 1px solid #ccc !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-    font-size: 14px !important;
-    line-height: 1.5 !important;
-}
-
-/* Additional file uploader elements */
-.stFileUploader label {
-    background-color: white !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-    font-weight: 500 !important;
-}
-
-.stFileUploader .uploadedFile {
-    background-color: white !important;
-    border: 1px solid #ccc !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-/* Ensure all nested elements have white background and proper typography */
-.stFileUploader * {
-    background-color: white !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-/* Override any dark themes */
-.stFileUploader .uploadedFileContent {
-    background-color: white !important;
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-/* Streamlit specific elements */
-.stApp {
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-.stMarkdown {
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-.stButton > button {
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-    font-weight: 500 !important;
-}
-
-.stSelectbox > div > div {
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-
-.stDataFrame {
-    font-family: 'Inter', 'Roboto', -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Helvetica Neue', Arial, sans-serif !important;
-}
-</style>
-""", unsafe_allow_html=True)
+st.markdown(load_css(), unsafe_allow_html=True)
 
 def main():
     st.title("Data Quality Rule Generator")
@@ -168,20 +90,62 @@ def main():
     """)
 
     # File upload
-    uploaded_file = st.file_uploader(
-        "Choose a CSV file",
-        type="csv",
-        help="Upload your CSV file to analyze"
+    multi_table = st.toggle(
+        "Multiple related datasets",
+        help="Profile several tables together and check referential integrity between them"
     )
+    uploaded_files = []
+    if multi_table:
+        uploaded_files = st.file_uploader(
+            "Choose related CSV files",
+            type="csv",
+            accept_multiple_files=True,
+            help="Upload the related tables; AI rules are generated for the primary table"
+        )
+        uploaded_file = None
+        if uploaded_files:
+            primary_name = st.selectbox("Primary table", [f.name for f in uploaded_files])
+            uploaded_file = next(f for f in uploaded_files if f.name == primary_name)
+    else:
+        uploaded_file = st.file_uploader(
+            "Choose a CSV file",
+            type="csv",
+            help="Upload your CSV file to analyze"
+        )
 
     if uploaded_file is not None:
         try:
+            import pandas as pd
+            from utils.data_analyzer import DataAnalyzer
+            from utils.openai_helper import OpenAIHelper
+            from utils.rule_generator import RuleGenerator
+            from utils.kpi_analyzer import KPIAnalyzer
+
             # Load and display data preview
-            df = pd.read_csv(uploaded_file)
+            tables = {}
+            if uploaded_files:
+                from utils.multi_table_analyzer import MultiTableAnalyzer, table_name_from_filename
+
+                for f in uploaded_files:
+                    f.seek(0)
+                    tables[table_name_from_filename(f.name)] = pd.read_csv(f)
+                df = tables[table_name_from_filename(uploaded_file.name)]
+                rules_source = tuple(f.file_id for f in uploaded_files) + (uploaded_file.file_id,)
+            else:
+                df = pd.read_csv(uploaded_file)
+                rules_source = uploaded_file.file_id
 
             with st.expander("Data Preview", expanded=True):
                 st.dataframe(df.head(), use_container_width=True)
 
+            if tables:
+                with st.expander("Related Tables", expanded=False):
+                    st.dataframe(pd.DataFrame({
+                        "Table": list(tables.keys()),
+                        "Rows": [len(table_df) for table_df in tables.values()],
+                        "Columns": [len(table_df.columns) for table_df in tables.values()]
+                    }), use_container_width=True)
+
             # Data context input
             st.subheader("Data Context")
             user_context = st.text_area(
@@ -193,9 +157,15 @@ def main():
             )
 
             # Initialize analyzers
-            data_analyzer = DataAnalyzer(df)
+            data_analyzer = DataAnalyzer(df, profile_workers=os.cpu_count() or 1)
             openai_helper = OpenAIHelper()
-            rule_generator = RuleGenerator(data_analyzer, openai_helper)
+            reuse_rules = st.toggle(
+                "Reuse rules from similar datasets",
+                value=True,
+                help="Remap rules generated earlier for a near-identical schema and only ask the AI about new columns"
+            )
+            rule_generator = RuleGenerator(data_analyzer, openai_helper,
+                                           schema_index=load_schema_index() if reuse_rules else None)
             kpi_analyzer = KPIAnalyzer()
 
             # Display basic stats
@@ -214,14 +184,59 @@ def main():
             if st.button("Generate Data Quality Rules"):
                 with st.spinner("DQ Agent working..."):
                     # Pass user context to rule generation
-                    rules = rule_generator.generate_rules(user_context)
-                    formatted_rules = rule_generator.format_rules_for_display(rules)
-                    
-                    # Analyze KPIs
-                    kpi_data = kpi_analyzer.analyze_rules(rules, data_analyzer)
+                    rules = rule_generator.generate_rules(user_context, dataset_name=uploaded_file.name)
+                    if tables:
+                        # Cross-table checks sit next to cross_column as their own category
+                        multi_table_analyzer = MultiTableAnalyzer(tables)
+                        rules.add_category(
+                            "referential_integrity", multi_table_analyzer.generate_referential_integrity_rules()
+                        )
+                    st.session_state["rules"] = rules
+                    st.session_state["generation_stats"] = rule_generator.generation_stats
+                    st.session_state["rules_source"] = rules_source
+                    reset_rule_curation()
+
+            # Keep generated rules across reruns so export actions don't discard them
+            if st.session_state.get("rules_source") == rules_source:
+                rules = st.session_state["rules"]
+                formatted_rules = rule_generator.format_rules_for_display(rules)
+                rejected_rules = st.session_state.setdefault("rejected_rules", set())
+                accepted_rules = rules.without(rejected_rules)
+
+                # Analyze KPIs once per generation; accept/reject/edit then
+                # update the stored analyzer one rule at a time
+                if "kpi_analyzer" not in st.session_state:
+                    kpi_analyzer.analyze_rules(accepted_rules, data_analyzer)
+                    st.session_state["kpi_analyzer"] = kpi_analyzer
+                kpi_analyzer = st.session_state["kpi_analyzer"]
+                kpi_data = kpi_analyzer.kpi_data
 
                 # Display KPI Dashboard
                 st.header("Rules Generated")
+
+                generation_stats = st.session_state.get("generation_stats", {})
+                if generation_stats.get("unrecovered_categories"):
+                    st.warning("Some categories could not be generated after retrying: "
+                               f"{', '.join(generation_stats['unrecovered_categories'])}")
+                if generation_stats.get("retries"):
+                    st.caption(f"{generation_stats['retries']} partial retries recovered "
+                               f"{len(generation_stats['recovered_categories'])} categories "
+                               f"({generation_stats['api_calls']} API calls in total)")
+                schema_reuse = generation_stats.get("schema_reuse")
+                if schema_reuse:
+                    renamed = sum(1 for old, new in schema_reuse["column_mapping"].items() if old != new)
+                    st.info(f"Reused {schema_reuse['reused_rules']} rules from {schema_reuse['name'] or 'a similar dataset'} "
+                            f"(schema similarity {schema_reuse['similarity']:.0%}, {renamed} columns renamed); "
+                            + (f"AI rules generated only for the new columns: {', '.join(schema_reuse['new_columns'])}"
+                               if schema_reuse["new_columns"] else "no AI call was needed"))
+                    if schema_reuse["dropped_rules"]:
+                        st.caption(f"{schema_reuse['dropped_rules']} stored rules referenced columns this dataset "
+                                   f"does not have and were left out")
+                if generation_stats.get("prompt_tokens"):
+                    prompt_tokens = generation_stats["prompt_tokens"]
+                    st.caption(f"Prompt tokens: {sum(item['tokens_before'] for item in prompt_tokens):,} before compaction, "
+                               f"{sum(item['tokens_after'] for item in prompt_tokens):,} sent "
+                               f"over {len(prompt_tokens)} calls (budget {prompt_tokens[0]['token_budget']:,} per call)")
                 
                 # Summary metrics
                 summary_metrics = kpi_analyzer.get_summary_metrics()
@@ -232,9 +247,13 @@ def main():
                     st.metric("Total Rules", summary_metrics["total_rules"])
                 with col2:
                     st.metric("Top Category", summary_metrics["top_category"])
+                if rejected_rules:
+                    st.caption(f"{len(rejected_rules)} of {len(rules)} rules rejected; KPIs and exports cover accepted rules only")
                 
                 
                 # KPI Charts
+                import plotly.express as px
+
                 col1, col2 = st.columns(2)
                 
                 with col1:
@@ -315,6 +334,15 @@ def main():
                             }
                             context_df = pd.DataFrame(context_data)
                             st.dataframe(context_df, use_container_width=True)
+
+                            implications = context["missingness"]["null_implications"]
+                            if implications:
+                                st.subheader("Null Co-occurrence")
+                                st.dataframe(pd.DataFrame({
+                                    "If Null": [item["if_null"] for item in implications],
+                                    "Then Null": [item["then_null"] for item in implications],
+                                    "Confidence": [item["confidence"] for item in implications]
+                                }), use_container_width=True)
                 
                 st.divider()
                 
@@ -325,50 +353,103 @@ def main():
                 for category, rule_list in formatted_rules.items():
                     with st.expander(category, expanded=True):
                         for rule in rule_list:
-                            if isinstance(rule, dict):
-                                # Handle detailed rule objects with error checking
-                                try:
-                                    rule_text = rule.get('rule', 'No rule description available')
-                                    # Check for both 'columns' (new format) and 'columns_involved' (cross-column format)
-                                    columns = rule.get('columns', rule.get('columns_involved', ['Unknown columns']))
-                                    # Check for both 'type' (new format) and 'validation_type' (cross-column format)
-                                    validation_type = rule.get('type', rule.get('validation_type', 'Unknown type'))
-                                    # Get pseudo SQL code
-                                    pseudo_sql = rule.get('pseudo_sql', 'No SQL code available')
-                                    
-                                    # Use native Streamlit components for clean layout
-                                    st.subheader("Rule Description", divider=True)
-                                    st.write(rule_text)
-
-                                    col1, col2 = st.columns(2)
-                                    with col1:
-                                        st.caption("**Affected Columns**")
-                                        st.write(', '.join(columns) if isinstance(columns, list) else str(columns))
-
-                                    with col2:
-                                        st.caption("**Validation Type**")
-                                        st.write(validation_type)
-
-                                    # Display pseudo SQL code in a code block
-                                    if pseudo_sql and pseudo_sql != 'No SQL code available':
-                                        st.caption("**Implementation**")
-                                        st.code(pseudo_sql, language='sql')
-
-                                    st.divider()
-                                    
-                                except Exception as e:
-                                    # Fallback for malformed rule objects
-                                    st.markdown(f"• {str(rule)}")
+                            if rule.is_detailed:
+                                # Use native Streamlit components for clean layout
+                                st.subheader("Rule Description", divider=True)
+                                st.write(rule.text)
+
+                                col1, col2 = st.columns(2)
+                                with col1:
+                                    st.caption("**Affected Columns**")
+                                    st.write(', '.join(rule.columns) or 'Unknown columns')
+
+                                with col2:
+                                    st.caption("**Validation Type**")
+                                    st.write(rule.rule_type)
+
+                                # Display pseudo SQL code in a code block
+                                if rule.has_sql:
+                                    st.caption("**Implementation**")
+                                    st.code(rule.pseudo_sql, language='sql')
+
+                                col1, col2 = st.columns(2)
+                                with col1:
+                                    st.checkbox(
+                                        "Accept rule",
+                                        value=rule.rule_id not in rejected_rules,
+                                        key=f"rule_accept_{rule.rule_id}",
+                                        on_change=toggle_rule,
+                                        args=(rule.rule_id,)
+                                    )
+                                with col2:
+                                    with st.popover("✏️ Edit rule"):
+                                        st.text_area("Rule description", value=rule.text, key=f"rule_text_{rule.rule_id}")
+                                        st.text_area("Pseudo SQL", value=rule.pseudo_sql or "", key=f"rule_sql_{rule.rule_id}")
+                                        st.button("Save", key=f"rule_save_{rule.rule_id}",
+                                                  on_click=save_rule_edit, args=(rule.rule_id,))
+
+                                st.divider()
                             else:
                                 # Handle simple rules
-                                st.markdown(f"• {rule}")
+                                st.checkbox(
+                                    rule.text,
+                                    value=rule.rule_id not in rejected_rules,
+                                    key=f"rule_accept_{rule.rule_id}",
+                                    on_change=toggle_rule,
+                                    args=(rule.rule_id,)
+                                )
+
+                # Check rules on random samples before paying for full scans
+                with st.expander("🧪 Approximate Validation", expanded=False):
+                    st.caption("Rules run on growing random samples; a rule stops as soon as its violation rate's "
+                               "95% confidence interval is clearly above or below the threshold.")
+                    broken_rate = st.number_input("Flag rules violated by more than (%)", min_value=1, max_value=100,
+                                                  value=20, step=1) / 100
+
+                    if st.button("Validate on Samples"):
+                        from utils.sample_validator import SampleValidator
+
+                        estimates = {}
+                        progress = st.empty()
+                        for estimate in SampleValidator(df, tables, broken_rate=broken_rate).iter_estimates(accepted_rules):
+                            estimates[estimate["rule_id"]] = estimate
+                            progress.dataframe(pd.DataFrame(estimates.values()), use_container_width=True)
+                        progress.empty()
+                        st.session_state["sample_estimates"] = estimates
+                        st.session_state.pop("full_validation", None)
+
+                    estimates = st.session_state.get("sample_estimates")
+                    if estimates:
+                        estimates_df = pd.DataFrame(estimates.values())
+                        st.dataframe(estimates_df, use_container_width=True)
+                        broken = [rule_id for rule_id, estimate in estimates.items() if estimate["status"] == "broken"]
+                        if broken:
+                            st.warning(f"Likely wrong thresholds (review before a full run): {', '.join(broken)}")
+
+                        confirmed = st.multiselect(
+                            "Rules to validate on the full table",
+                            list(estimates),
+                            default=[rule_id for rule_id, estimate in estimates.items()
+                                     if estimate["status"] not in ("broken", "error")]
+                        )
+                        if confirmed and st.button("Run Full Validation"):
+                            from utils.sample_validator import SampleValidator
+
+                            with st.spinner("Running confirmed rules on the full table..."):
+                                st.session_state["full_validation"] = SampleValidator(df, tables).validate_full(
+                                    accepted_rules, confirmed
+                                )
+                        if st.session_state.get("full_validation"):
+                            st.subheader("Full Validation")
+                            st.dataframe(pd.DataFrame.from_dict(st.session_state["full_validation"], orient="index"),
+                                         use_container_width=True)
 
                 # Export rules and KPIs
                 st.header("📥 Export Options")
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
-                    rules_json = rule_generator.export_rules_to_json(rules)
+                    rules_json = rule_generator.export_rules_to_json(accepted_rules)
                     st.download_button(
                         label="📋 Download Rules as JSON",
                         data=rules_json,
@@ -377,21 +458,20 @@ def main():
                     )
                 
                 with col2:
-                    # Extract and export SQL code only - simplified approach
-                    sql_content = "-- Data Quality Rules - Pseudo SQL Code\n"
-                    sql_content += f"-- Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-                    
+                    # Extract and export SQL code only
+                    sql_parts = [
+                        "-- Data Quality Rules - Pseudo SQL Code\n",
+                        f"-- Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+                    ]
                     sql_found = False
-                    for category, rule_list in rules.items():
-                        if isinstance(rule_list, list):
-                            for rule in rule_list:
-                                if isinstance(rule, dict) and 'pseudo_sql' in rule:
-                                    sql_found = True
-                                    sql_content += f"-- {category.upper()}: {rule.get('rule', '')}\n"
-                                    columns = rule.get('columns', rule.get('columns_involved', []))
-                                    sql_content += f"-- Columns: {', '.join(columns) if isinstance(columns, list) else columns}\n"
-                                    sql_content += f"{rule.get('pseudo_sql', '')}\n\n"
-                    
+                    for rule in accepted_rules:
+                        if rule.pseudo_sql:
+                            sql_found = True
+                            sql_parts.append(f"-- {rule.category.value.upper()}: {rule.text}\n"
+                                             f"-- Columns: {', '.join(rule.columns)}\n"
+                                             f"{rule.pseudo_sql}\n\n")
+                    sql_content = "".join(sql_parts)
+
                     if sql_found:
                         st.download_button(
                             label="💾 Download SQL Code Only",
@@ -410,6 +490,168 @@ def main():
                         mime="application/json"
                     )
 
+                # Export violating rows
+                with st.expander("🚨 Export Violating Rows", expanded=False):
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        export_format = st.selectbox("Format", ["csv", "parquet"])
+                    with col2:
+                        export_mode = st.selectbox(
+                            "Layout", ["per_rule", "union"],
+                            format_func=lambda mode: "One file set per rule" if mode == "per_rule" else "Single file tagged with rule id"
+                        )
+                    with col3:
+                        row_cap = st.number_input("Max rows per rule (0 = no cap)", min_value=0, value=10000, step=1000)
+
+                    if st.button("Run Rules and Export Violations"):
+                        from utils.rule_executor import RuleExecutor
+                        from utils.violation_exporter import ViolationExporter
+
+                        with st.spinner("Running rules..."):
+                            export_dir = tempfile.mkdtemp(prefix="dq_violations_")
+                            rule_executor = RuleExecutor(df)
+                            for table_name, table_df in tables.items():
+                                rule_executor.register_table(table_name, table_df)
+                            try:
+                                manifest = ViolationExporter(
+                                    rule_executor,
+                                    export_dir,
+                                    file_format=export_format,
+                                    max_rows_per_rule=row_cap or None
+                                ).export(accepted_rules, mode=export_mode)
+                            finally:
+                                rule_executor.close()
+                            archive_path = shutil.make_archive(export_dir, "zip", export_dir)
+                            archive_data = None
+                            if os.path.getsize(archive_path) <= MAX_DOWNLOAD_BYTES:
+                                with open(archive_path, "rb") as archive:
+                                    archive_data = archive.read()
+                                shutil.rmtree(export_dir, ignore_errors=True)
+                            os.remove(archive_path)
+
+                        failed_rules = [rule_id for rule_id, entry in manifest["rules"].items() if "error" in entry]
+                        st.write(f"Exported {sum(entry['violating_rows'] for entry in manifest['rules'].values())} "
+                                 f"violating rows for {len(manifest['rules'])} rules")
+                        if failed_rules:
+                            st.warning(f"Rules whose SQL could not be executed: {', '.join(failed_rules)}")
+                        if archive_data is None:
+                            st.info(f"The export is larger than {MAX_DOWNLOAD_BYTES // (1024 * 1024)} MB, too large "
+                                    f"to download through the browser; the files are in {export_dir}")
+                        else:
+                            st.download_button(
+                                label="📦 Download Violating Rows",
+                                data=archive_data,
+                                file_name="data_quality_violations.zip",
+                                mime="application/zip"
+                            )
+
+                # Drill into rows by rule combination without re-running the SQL
+                with st.expander("🔎 Failure Drill-down", expanded=False):
+                    if st.button("Build Failure Bitmaps",
+                                 help="Run each accepted rule once and keep its violating rows as a compressed bitmap"):
+                        from utils.failure_bitmaps import FailureBitmaps
+                        from utils.rule_executor import RuleExecutor
+
+                        with st.spinner("Running rules..."):
+                            rule_executor = RuleExecutor(df)
+                            for table_name, table_df in tables.items():
+                                rule_executor.register_table(table_name, table_df)
+                            try:
+                                st.session_state["failure_bitmaps"] = FailureBitmaps.build(rule_executor, accepted_rules)
+                            finally:
+                                rule_executor.close()
+
+                    failure_bitmaps = st.session_state.get("failure_bitmaps")
+                    if failure_bitmaps is not None:
+                        import json
+
+                        if failure_bitmaps.errors:
+                            st.warning(f"Rules whose rows could not be identified: {', '.join(failure_bitmaps.errors)}")
+
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            selected_rules = st.multiselect(
+                                "Rules", list(failure_bitmaps.bitmaps),
+                                format_func=lambda rule_id: f"{rule_id}: {rules.get(rule_id).text}"
+                            )
+                        with col2:
+                            combine = st.radio("Rows failing", ["all selected rules", "any selected rule"], horizontal=True)
+                        if selected_rules:
+                            matched = (failure_bitmaps.failing_all(selected_rules) if combine == "all selected rules"
+                                       else failure_bitmaps.failing_any(selected_rules))
+                            st.metric("Matching Rows", len(matched))
+                            st.dataframe(df.iloc[matched.to_array()[:100]], use_container_width=True)
+
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.metric("Rows Passing Every Rule", len(failure_bitmaps.passing_all()))
+                        with col2:
+                            st.metric("Mean Row Quality Score", f"{failure_bitmaps.row_scores().mean():.1%}")
+
+                        worst_rows = failure_bitmaps.worst_rows()
+                        if worst_rows:
+                            st.subheader("Rows Failing the Most Rules")
+                            worst_df = df.iloc[[position for position, _ in worst_rows]].copy()
+                            worst_df.insert(0, "Rules Failed", [failed for _, failed in worst_rows])
+                            st.dataframe(worst_df, use_container_width=True)
+
+                        st.download_button(
+                            label="🧮 Download Failure Bitmaps",
+                            data=json.dumps(failure_bitmaps.to_dict()),
+                            file_name="data_quality_failure_bitmaps.json",
+                            mime="application/json"
+                        )
+
+                # Quality history across runs of the same dataset layout
+                from utils.history_store import HistoryStore, dataset_fingerprint
+
+                st.header("📚 Quality History")
+                history_store = HistoryStore()
+                fingerprint = dataset_fingerprint(df)
+
+                if st.button("Record Run in History",
+                             help="Count the violations of each accepted rule and store them with the KPIs"):
+                    import sqlite3
+                    from utils.rule_executor import RuleExecutor, iter_executable_rules
+
+                    with st.spinner("Counting violations..."):
+                        rule_executor = RuleExecutor(df)
+                        for table_name, table_df in tables.items():
+                            rule_executor.register_table(table_name, table_df)
+                        violation_counts = {}
+                        try:
+                            for rule_id, _, rule in iter_executable_rules(accepted_rules):
+                                try:
+                                    violation_counts[rule_id] = rule_executor.count_violations(rule)
+                                except sqlite3.Error:
+                                    continue
+                        finally:
+                            rule_executor.close()
+                        history_store.record_run(fingerprint, kpi_analyzer, violation_counts, accepted_rules)
+                    st.success(f"Recorded {sum(violation_counts.values())} violations across {len(violation_counts)} rules")
+
+                trend = history_store.trend(fingerprint)
+                if trend.empty:
+                    st.info("No runs recorded for this dataset yet")
+                else:
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        fig = px.line(trend, x="timestamp", y=["quality_score", "sql_coverage_percentage"],
+                                      markers=True, title="Quality Score and SQL Coverage (12 months)")
+                        st.plotly_chart(fig, use_container_width=True)
+                    with col2:
+                        fig = px.line(trend, x="timestamp", y="total_violations",
+                                      markers=True, title="Violating Rows per Run (12 months)")
+                        st.plotly_chart(fig, use_container_width=True)
+
+                    for regression in history_store.regressions(fingerprint):
+                        st.warning(f"{regression['metric'].replace('_', ' ').title()} regressed from "
+                                   f"{regression['previous']:g} to {regression['latest']:g} since the previous run")
+                    degraded_rules = history_store.top_degraded_rules(fingerprint)
+                    if degraded_rules:
+                        st.subheader("Most Degraded Rules")
+                        st.dataframe(pd.DataFrame(degraded_rules), use_container_width=True)
+
         except Exception as e:
             st.error(f"Error processing file: {str(e)}")
 
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.failure_bitmaps import ARRAY_LIMIT, FailureBitmaps, RowBitmap
+from utils.rule_executor import RuleExecutor
+from utils.rule_model import RuleSet
+
+ROWS = 4 * 65536
+
+
+def _positions(rng, density, rows=ROWS):
+    return set(rng.choice(rows, size=int(rows * density), replace=False).tolist())
+
+
+# Densities that put containers on both sides of ARRAY_LIMIT, plus empty and full sets
+DENSITIES = [0.0, 0.001, ARRAY_LIMIT / 65536, 0.2, 0.9, 1.0]
+
+
+@pytest.mark.parametrize("density_a", DENSITIES)
+@pytest.mark.parametrize("density_b", DENSITIES)
+def test_set_operations_match_python_sets(density_a, density_b):
+    rng = np.random.default_rng(int(density_a * 1000) * 31 + int(density_b * 1000))
+    a, b = _positions(rng, density_a), _positions(rng, density_b)
+    bitmap_a, bitmap_b = RowBitmap.from_positions(sorted(a)), RowBitmap.from_positions(sorted(b))
+    for result, expected in ((bitmap_a & bitmap_b, a & b), (bitmap_a | bitmap_b, a | b), (bitmap_a - bitmap_b, a - b)):
+        assert result.to_array().tolist() == sorted(expected)
+        assert len(result) == len(expected)
+        # Results are kept in canonical form, so equal sets compare equal
+        assert result == RowBitmap.from_positions(sorted(expected))
+
+
+def test_containers_switch_form_at_array_limit():
+    sparse = RowBitmap.from_positions(range(ARRAY_LIMIT))
+    dense = RowBitmap.from_positions(range(ARRAY_LIMIT + 1))
+    assert sparse._containers[0].dtype == np.uint16
+    assert dense._containers[0].dtype == np.uint64
+    # Removing one value brings a bitmap container back to an array
+    assert (dense - RowBitmap.from_positions([0]))._containers[0].dtype == np.uint16
+
+
+def test_membership_and_multiway_operations():
+    rng = np.random.default_rng(5)
+    sets = [_positions(rng, density) for density in (0.01, 0.3, 0.05, 0.6)]
+    bitmaps = [RowBitmap.from_positions(sorted(positions)) for positions in sets]
+    assert RowBitmap.union(bitmaps).to_array().tolist() == sorted(set.union(*sets))
+    assert RowBitmap.intersection(bitmaps).to_array().tolist() == sorted(set.intersection(*sets))
+    assert len(RowBitmap.intersection([])) == 0
+    probes = rng.integers(0, ROWS, 2000).tolist()
+    assert [position in bitmaps[0] for position in probes] == [position in sets[0] for position in probes]
+    assert RowBitmap.full(70000).to_array().tolist() == list(range(70000))
+
+
+@pytest.mark.parametrize("density", DENSITIES)
+def test_serialization_round_trip(density):
+    bitmap = RowBitmap.from_positions(sorted(_positions(np.random.default_rng(2), density)))
+    assert RowBitmap.from_bytes(bitmap.to_bytes()) == bitmap
+    with pytest.raises(ValueError):
+        RowBitmap.from_bytes(b"nope" + bitmap.to_bytes()[4:])
+
+
+def _rules():
+    return RuleSet.from_dict({
+        "validity": [{"rule": "Age in range", "columns": ["age"],
+                      "pseudo_sql": "SELECT * FROM table_name WHERE age < 0 OR age > 120"},
+                     {"rule": "Age in range (some columns)", "columns": ["id", "age"],
+                      "pseudo_sql": "SELECT id, age FROM table_name WHERE age < 0 OR age > 120"}],
+        "uniqueness": [{"rule": "Email is unique", "columns": ["email"],
+                        "pseudo_sql": "SELECT email, COUNT(*) FROM table_name WHERE age >= 0 "
+                                      "GROUP BY email HAVING COUNT(*) > 1"}],
+        "referential_integrity": [{"rule": "Customer exists", "columns": ["id"],
+                                   "pseudo_sql": "SELECT c.* FROM table_name c LEFT JOIN customers p "
+                                                 "ON c.id = p.id WHERE p.id IS NULL"}]
+    })
+
+
+def test_build_matches_pandas():
+    rng = np.random.default_rng(11)
+    rows = 20000
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "age": rng.integers(-10, 130, rows),
+        "email": np.where(rng.random(rows) < 0.05, None, rng.integers(0, 15000, rows).astype(str))
+    })
+    executor = RuleExecutor(df)
+    executor.register_table("customers", pd.DataFrame({"id": np.arange(100)}))
+    try:
+        bitmaps = FailureBitmaps.build(executor, _rules())
+    finally:
+        executor.close()
+
+    out_of_range = np.flatnonzero(((df["age"] < 0) | (df["age"] > 120)).to_numpy()).tolist()
+    assert bitmaps.bitmaps["validity_1"].to_array().tolist() == out_of_range
+    assert bitmaps.bitmaps["validity_2"].to_array().tolist() == out_of_range
+    # GROUP BY puts NULL emails in one group, like duplicated(keep=False)
+    filtered = df[df["age"] >= 0]
+    duplicated = filtered.index[filtered["email"].duplicated(keep=False)].tolist()
+    assert bitmaps.bitmaps["uniqueness_1"].to_array().tolist() == duplicated
+    # A rule that reads another table does not flag rows of this one
+    assert "referential_integrity_1" in bitmaps.errors
+    assert "referential_integrity_1" not in bitmaps.bitmaps
+
+    any_failure = set(out_of_range) | set(duplicated)
+    assert bitmaps.failing_any().to_array().tolist() == sorted(any_failure)
+    assert len(bitmaps.passing_all()) == rows - len(any_failure)
+    assert FailureBitmaps.from_dict(bitmaps.to_dict()).bitmaps == bitmaps.bitmaps
+
+
+def test_count_violating_rows_matches_row_ids():
+    df = pd.DataFrame({"key": [1, 1, 2, 3, 3, 3, None, None], "value": range(8)})
+    executor = RuleExecutor(df)
+    try:
+        for rule in RuleSet.from_dict({"uniqueness": [
+            {"rule": "Key is unique", "columns": ["key"],
+             "pseudo_sql": "SELECT key, COUNT(*) FROM table_name GROUP BY key HAVING COUNT(*) > 1"}
+        ]}):
+            assert sorted(executor.violating_row_ids(rule)) == [0, 1, 3, 4, 5, 6, 7]
+            assert executor.count_violating_rows(rule) == 7
+            # count_violations counts the duplicated keys the query returns
+            assert executor.count_violations(rule) == 3
+    finally:
+        executor.close()
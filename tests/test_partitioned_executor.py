@@ -0,0 +1,120 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.partitioned_executor import PartitionedExecutor, _WorkerServer, plan_rules
+from utils.rule_executor import RuleExecutor
+from utils.rule_model import RuleSet
+
+RULES = RuleSet.from_dict({
+    "validity": [{"rule": "Age is between 0 and 120", "columns": ["age"],
+                  "pseudo_sql": "SELECT * FROM table_name WHERE age < 0 OR age > 120"},
+                 {"rule": "Age above average", "columns": ["age"],
+                  "pseudo_sql": "SELECT * FROM table_name WHERE age > (SELECT AVG(age) FROM table_name)"}],
+    "completeness": [{"rule": "Email is present", "columns": ["email"],
+                      "pseudo_sql": "SELECT * FROM table_name WHERE email IS NULL"}],
+    "uniqueness": [{"rule": "Id is unique", "columns": ["id"],
+                    "pseudo_sql": "SELECT id, COUNT(*) FROM table_name GROUP BY id HAVING COUNT(*) > 1"},
+                   {"rule": "Id and email are unique", "columns": ["id", "email"],
+                    "pseudo_sql": "SELECT id, email, COUNT(*) FROM table_name WHERE age >= 0 "
+                                  "GROUP BY id, email HAVING COUNT(*) > 1"}]
+})
+
+
+def _frame(rows=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": rng.integers(0, rows // 2, rows),
+        "age": rng.integers(-5, 130, rows),
+        "email": np.where(rng.random(rows) < 0.1, None, rng.integers(0, 3, rows).astype(str))
+    })
+
+
+def _expected(df):
+    """Single-process answers from RuleExecutor"""
+    executor = RuleExecutor(df)
+    try:
+        return {rule.rule_id: (executor.count_violations(rule), executor.count_violating_rows(rule)) for rule in RULES}
+    finally:
+        executor.close()
+
+
+def _check(results, df):
+    expected = _expected(df)
+    assert results["row_count"] == len(df)
+    for rule_id, result in results["rules"].items():
+        if result["mode"] == "unpartitioned":
+            assert "error" in result
+            continue
+        assert result["violating_rows"] == expected[rule_id][0], rule_id
+        if result["mode"] == "unique_key":
+            assert result["duplicate_rows"] == expected[rule_id][1], rule_id
+            assert result["keys"] == (len(df) if rule_id == "uniqueness_1" else (df["age"] >= 0).sum())
+
+
+def test_plan_rules():
+    kinds = {spec["rule_id"]: spec["kind"] for spec in plan_rules(RULES, ["id", "age", "email"])}
+    assert kinds == {"validity_1": "row_filter", "validity_2": "unpartitioned", "completeness_1": "row_filter",
+                     "uniqueness_1": "unique_key", "uniqueness_2": "unique_key"}
+
+
+def test_dataframe_partitions_match_single_process():
+    df = _frame()
+    results = PartitionedExecutor(df, max_workers=2).run(RULES)
+    assert results["partitions"] > 1
+    _check(results, df)
+    ages = df["age"][(df["age"] < 0) | (df["age"] > 120)]
+    assert results["rules"]["validity_1"]["min"] == {"age": ages.min()}
+    assert results["rules"]["validity_1"]["max"] == {"age": ages.max()}
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".csv"])
+def test_file_partitions_match_single_process(tmp_path, suffix):
+    df = _frame(seed=1)
+    # A NULL id in one partition makes that file's id column float; keys must still hash equal
+    df["id"] = df["id"].astype("Int64")
+    df.loc[5, "id"] = pd.NA
+    files = []
+    for index, part in enumerate(np.array_split(np.arange(len(df)), 3)):
+        path = str(tmp_path / f"part-{index}{suffix}")
+        chunk = df.iloc[part]
+        chunk.to_parquet(path) if suffix == ".parquet" else chunk.to_csv(path, index=False)
+        files.append(path)
+    _check(PartitionedExecutor(files=files, max_workers=2).run(RULES), df)
+
+
+def test_unpartitioned_rules_alone_do_not_load_the_table(tmp_path):
+    df = _frame(rows=1000)
+    path = str(tmp_path / "part.parquet")
+    df.to_parquet(path)
+    rules = RuleSet.from_dict({"validity": [RULES.to_dict()["validity"][1]]})
+    results = PartitionedExecutor(files=[path]).run(rules)
+    assert results["row_count"] == 1000 and results["partitions"] == 0
+    assert "error" in results["rules"]["validity_1"]
+
+
+@pytest.fixture
+def worker(tmp_path):
+    server = _WorkerServer(("127.0.0.1", 0), token="secret", data_root=str(tmp_path))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_socket_workers_match_single_process(worker):
+    df = _frame(rows=5000)
+    _check(PartitionedExecutor(df, nodes=[worker], max_workers=2, token="secret").run(RULES), df)
+
+
+def test_socket_worker_rejects_wrong_token_and_outside_paths(worker, tmp_path):
+    df = _frame(rows=100)
+    with pytest.raises(RuntimeError, match="token"):
+        PartitionedExecutor(df, nodes=[worker], token="wrong").run(RULES)
+    outside = tmp_path.parent / "outside.csv"
+    df.to_csv(outside, index=False)
+    with pytest.raises(RuntimeError, match="data root"):
+        PartitionedExecutor(files=[str(outside)], nodes=[worker], token="secret").run(RULES)
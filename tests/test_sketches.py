@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.sketches import HyperLogLog, KLLSketch, MinHash, estimate_containment, fixed_bin_histogram, hash_series
+
+QS = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def _rank_errors(values, estimates, qs):
+    """How far each estimate's rank in the data is from the requested quantile"""
+    ordered = np.sort(values)
+    errors = []
+    for q, estimate in zip(qs, estimates):
+        low = np.searchsorted(ordered, estimate, side="left") / len(ordered)
+        high = np.searchsorted(ordered, estimate, side="right") / len(ordered)
+        # Ties give the estimate a range of ranks; any rank in it is exact
+        errors.append(0.0 if low <= q <= high else min(abs(low - q), abs(high - q)))
+    return errors
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "normal", "lognormal", "ties"])
+def test_kll_quantiles_within_rank_error(distribution):
+    rng = np.random.default_rng(7)
+    values = {
+        "uniform": lambda: rng.random(300000),
+        "normal": lambda: rng.normal(size=300000),
+        "lognormal": lambda: rng.lognormal(sigma=2, size=300000),
+        "ties": lambda: rng.integers(0, 50, 300000).astype(float)
+    }[distribution]()
+    sketch = KLLSketch(k=200, seed=0).update(values)
+    assert sketch.n == len(values)
+    assert max(_rank_errors(values, sketch.quantiles(QS), QS)) <= sketch.rank_error
+    # The extremes are tracked exactly
+    assert sketch.quantiles([0, 1]) == [values.min(), values.max()]
+    np.testing.assert_allclose(sketch.quantiles([0.5]), np.quantile(values, [0.5]), rtol=0.1, atol=0.1)
+
+
+def test_kll_merge_matches_single_stream():
+    rng = np.random.default_rng(3)
+    parts = [rng.normal(loc, 1, 50000) for loc in (0, 5, 10)]
+    merged = KLLSketch(k=200, seed=0)
+    for part in parts:
+        merged.merge(KLLSketch(k=200, seed=1).update(part))
+    values = np.concatenate(parts)
+    assert merged.n == len(values)
+    assert max(_rank_errors(values, merged.quantiles(QS), QS)) <= merged.rank_error
+
+
+def test_kll_ignores_nan_and_handles_empty():
+    assert KLLSketch().quantiles([0.5]) == [None]
+    sketch = KLLSketch(seed=0).update(np.array([np.nan, 1.0, 2.0, np.nan, 3.0]))
+    assert sketch.n == 3
+    assert sketch.quantiles([0.5]) == [2.0]
+
+
+@pytest.mark.parametrize("distinct", [10, 1000, 100000, 500000])
+def test_hyperloglog_count_within_three_standard_errors(distinct):
+    hll = HyperLogLog().update(hash_series(pd.Series(np.arange(distinct)).astype(str).repeat(2)))
+    assert abs(hll.count() - distinct) <= 3 * hll.relative_error * distinct + 1
+
+
+def test_hyperloglog_merge_equals_union():
+    left, right = pd.Series(np.arange(0, 60000)), pd.Series(np.arange(40000, 100000))
+    merged = HyperLogLog().update(hash_series(left)).merge(HyperLogLog().update(hash_series(right)))
+    union = HyperLogLog().update(hash_series(pd.concat([left, right])))
+    assert np.array_equal(merged.registers, union.registers)
+    with pytest.raises(ValueError):
+        HyperLogLog(p=10).merge(HyperLogLog(p=12))
+
+
+def test_hash_series_is_canonical():
+    # An int column read with NaNs (float) hashes like the int column; nulls are dropped
+    ints = hash_series(pd.Series([1, 2, 3]))
+    floats = hash_series(pd.Series([1.0, np.nan, 2.0, 3.0]))
+    assert np.array_equal(ints, floats)
+    assert np.array_equal(hash_series(pd.Series(["a", None, "b"])), hash_series(pd.Series(["a", "b"])))
+
+
+def test_minhash_estimates_jaccard_and_containment():
+    a, b = pd.Series(np.arange(0, 20000)), pd.Series(np.arange(10000, 30000))
+    jaccard = MinHash.from_series(a, num_perm=256).jaccard(MinHash.from_series(b, num_perm=256))
+    assert abs(jaccard - 1 / 3) < 0.08
+    assert abs(estimate_containment(jaccard, 20000, 20000) - 0.5) < 0.08
+
+
+def test_fixed_bin_histogram_matches_numpy():
+    values = np.random.default_rng(0).normal(size=10000)
+    counts, edges = fixed_bin_histogram(np.append(values, np.nan), bins=12)
+    expected_counts, expected_edges = np.histogram(values, bins=12)
+    assert list(counts) == expected_counts.tolist()
+    np.testing.assert_allclose(edges, expected_edges)
@@ -1,11 +1,33 @@
-import pandas as pd
+import warnings
+
 import numpy as np
-from dateutil.parser import parse
-import json
+import pandas as pd
+
+from utils.sketches import HyperLogLog, KLLSketch, fixed_bin_histogram, hash_series
+
+PERCENTILES = [0.01, 0.05, 0.5, 0.95, 0.99]
+PERCENTILE_LABELS = ["p1", "p5", "p50", "p95", "p99"]
 
 class DataAnalyzer:
-    def __init__(self, df):
+    def __init__(self, df, quantile_sketch_k=200, histogram_bins=10, exact_distinct_limit=100000,
+                 profile_workers=1, parallel_min_columns=32, parallel_min_cells=2000000):
         self.df = df
+        self.quantile_sketch_k = quantile_sketch_k
+        self.histogram_bins = histogram_bins
+        self.exact_distinct_limit = exact_distinct_limit
+        self.profile_workers = profile_workers
+        self.parallel_min_columns = parallel_min_columns
+        # Starting a spawn pool costs seconds; smaller tables profile faster serially
+        self.parallel_min_cells = parallel_min_cells
+        self._missingness_summary = None
+
+    def profile_options(self):
+        """Settings a worker needs to profile columns exactly like this analyzer"""
+        return {
+            "quantile_sketch_k": self.quantile_sketch_k,
+            "histogram_bins": self.histogram_bins,
+            "exact_distinct_limit": self.exact_distinct_limit
+        }
 
     def get_basic_stats(self):
         stats = {
@@ -47,29 +69,145 @@ class DataAnalyzer:
 
         return column_types
 
+    def get_missingness_summary(self):
+        """Null co-occurrence patterns across columns (see MissingnessAnalyzer)"""
+        if self._missingness_summary is None:
+            from utils.missingness_analyzer import MissingnessAnalyzer
+            self._missingness_summary = MissingnessAnalyzer(self.df).summary()
+        return self._missingness_summary
+
     def get_column_correlations(self):
         numeric_cols = self.df.select_dtypes(include=[np.number]).columns
         if len(numeric_cols) > 1:
             return self.df[numeric_cols].corr().to_dict()
         return {}
 
+    def get_strong_correlations(self, threshold=0.5):
+        """Numeric column pairs whose absolute Pearson correlation is at least threshold"""
+        numeric_cols = self.df.select_dtypes(include=[np.number]).columns
+        if len(numeric_cols) < 2:
+            return []
+        matrix = self.df[numeric_cols].corr()
+        pairs = []
+        for i, first in enumerate(numeric_cols):
+            for second in numeric_cols[i + 1:]:
+                value = matrix.at[first, second]
+                if not np.isnan(value) and abs(value) >= threshold:
+                    pairs.append({"columns": [first, second], "correlation": round(float(value), 3)})
+        pairs.sort(key=lambda pair: abs(pair["correlation"]), reverse=True)
+        return pairs
+
     def get_data_sample(self):
         return self.df.head(5).to_dict(orient='records')
 
     def generate_column_profiles(self):
+        if (self.profile_workers > 1 and len(self.df.columns) >= self.parallel_min_columns
+                and self.df.size >= self.parallel_min_cells):
+            from utils.parallel_profiler import (ParallelProfiler, ParallelProfilingUnavailable,
+                                                 parallel_profiling_available)
+            if parallel_profiling_available():
+                try:
+                    return ParallelProfiler(self.df, self.profile_workers, **self.profile_options()).generate_column_profiles()
+                except ParallelProfilingUnavailable:
+                    pass  # e.g. mixed-type columns Arrow cannot store; profile serially
+
         profiles = {}
         for column in self.df.columns:
-            profile = {
-                "unique_count": self.df[column].nunique(),
-                "missing_count": self.df[column].isnull().sum(),
-                "sample_values": self.df[column].dropna().head(5).tolist()
-            }
-            if pd.api.types.is_numeric_dtype(self.df[column]):
-                profile.update({
-                    "min": float(self.df[column].min()),
-                    "max": float(self.df[column].max()),
-                    "mean": float(self.df[column].mean()),
-                    "std": float(self.df[column].std())
-                })
-            profiles[column] = profile
+            profiles[column] = self.profile_column(column)
         return profiles
+
+    def profile_column(self, column):
+        series = self.df[column]
+        numeric = pd.api.types.is_numeric_dtype(series)
+        text = not numeric and (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series))
+        dates = _as_datetime(series) if text else None
+        hll = None
+        if text and dates is None and len(series) > self.exact_distinct_limit and _is_high_cardinality(series):
+            # Exact nunique on a large string column costs a full hash table of
+            # the values; HyperLogLog gives the count in fixed memory instead
+            hll = HyperLogLog().update(hash_series(series))
+        profile = {
+            "unique_count": hll.count() if hll is not None else series.nunique(),
+            "missing_count": series.isnull().sum(),
+            "sample_values": series.dropna().head(5).tolist()
+        }
+        if hll is not None:
+            profile["unique_count_relative_error"] = float(hll.relative_error)
+        if numeric:
+            profile.update({
+                "min": float(series.min()),
+                "max": float(series.max()),
+                "mean": float(series.mean()),
+                "std": float(series.std())
+            })
+            if not pd.api.types.is_bool_dtype(series):
+                profile.update(self._distribution_profile(series.to_numpy(dtype="float64", na_value=np.nan)))
+        elif dates is not None:
+            profile.update(self._datetime_profile(dates))
+        return profile
+
+    def _distribution_profile(self, values):
+        """Approximate percentiles, histogram and shape of a numeric column"""
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return {}
+        sketch = KLLSketch(k=self.quantile_sketch_k, seed=0).update(values)
+        percentiles = dict(zip(PERCENTILE_LABELS, sketch.quantiles(PERCENTILES)))
+        counts, edges = fixed_bin_histogram(values, bins=self.histogram_bins)
+        skewness = float(pd.Series(values).skew()) if len(values) > 2 else 0.0
+        return {
+            "percentiles": percentiles,
+            "percentile_rank_error": sketch.rank_error,
+            "histogram": {"bin_edges": edges, "counts": counts},
+            "distribution": {
+                "skewness": round(skewness, 3) if not np.isnan(skewness) else 0.0,
+                "shape": _distribution_shape(skewness)
+            }
+        }
+
+    def _datetime_profile(self, dates):
+        """Range, approximate percentiles and histogram of a date/time column"""
+        dates = dates.dropna()
+        if len(dates) == 0:
+            return {}
+        if getattr(dates.dt, "tz", None) is not None:
+            dates = dates.dt.tz_convert(None)
+        nanoseconds = dates.to_numpy(dtype="datetime64[ns]").astype("int64").astype("float64")
+        profile = self._distribution_profile(nanoseconds)
+        profile["percentiles"] = {label: _to_iso(value) for label, value in profile["percentiles"].items()}
+        profile["histogram"]["bin_edges"] = [_to_iso(edge) for edge in profile["histogram"]["bin_edges"]]
+        profile.pop("distribution")
+        profile.update({"min": _to_iso(nanoseconds.min()), "max": _to_iso(nanoseconds.max())})
+        return profile
+
+
+def _as_datetime(series, sample_size=100):
+    """Parse a text column as datetimes when its sample does; None otherwise"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    sample = series.dropna().head(sample_size)
+    if len(sample) == 0 or not sample.map(lambda value: isinstance(value, str)).all():
+        return None
+    # Plain numbers also parse as dates, so require something date-like in the text
+    if not sample.str.contains(r"[-/:]").all():
+        return None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if pd.to_datetime(sample, errors="coerce").isna().any():
+            return None
+        return pd.to_datetime(series, errors="coerce")
+
+
+def _is_high_cardinality(series, sample_size=10000):
+    sample = series.head(sample_size)
+    return sample.nunique() > len(sample) // 2
+
+
+def _to_iso(nanoseconds):
+    return pd.Timestamp(int(nanoseconds)).isoformat()
+
+
+def _distribution_shape(skewness):
+    if np.isnan(skewness) or abs(skewness) < 0.5:
+        return "symmetric"
+    return "right_skewed" if skewness > 0 else "left_skewed"
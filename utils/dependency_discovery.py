@@ -0,0 +1,183 @@
+import time
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+
+class DependencyDiscovery:
+    """Discover column relationships on a sample of a DataFrame.
+
+    Finds exact and approximate functional dependencies (X -> A) and minimal
+    unique column combinations level by level with partition refinement: each
+    column set is encoded as a partition of the rows, a set's partition is
+    refined from its subsets, and supersets of keys or of left-hand sides that
+    already determine A are pruned. Categorical pairs also get Cramér's V.
+    Everything stops when the time budget runs out, keeping what was found.
+    """
+
+    def __init__(self, df, sample_size=20000, max_lhs_size=2, max_error=0.05, max_categories=50,
+                 max_lhs_cardinality_ratio=0.5, time_budget=5.0, seed=0):
+        if len(df) > sample_size:
+            df = df.sample(sample_size, random_state=seed)
+        self.df = df
+        self.n = len(df)
+        self.max_lhs_size = max_lhs_size
+        self.max_error = max_error
+        self.max_categories = max_categories
+        self.max_lhs_cardinality_ratio = max_lhs_cardinality_ratio
+        self.time_budget = time_budget
+        self.timed_out = False
+        self._deadline = None
+        self._partitions = {}
+        self._results = None
+
+    def discover(self):
+        if self._results is not None:
+            return self._results
+        self._deadline = time.perf_counter() + self.time_budget
+        columns = [column for column in self.df.columns]
+        for column in columns:
+            codes, _ = pd.factorize(self.df[column], use_na_sentinel=False)
+            self._partitions[frozenset([column])] = (codes.astype(np.int64), int(codes.max()) + 1 if len(codes) else 0)
+
+        functional_dependencies, unique_combinations = self._discover_dependencies(columns)
+        self._results = {
+            "sample_rows": self.n,
+            "functional_dependencies": functional_dependencies,
+            "unique_combinations": unique_combinations,
+            "associations": self._categorical_associations(columns),
+            "timed_out": self.timed_out
+        }
+        return self._results
+
+    def top_candidates(self, limit=15):
+        """The highest-ranked relationships, as short descriptions for a prompt"""
+        results = self.discover()
+        ranked = []
+        for fd in results["functional_dependencies"]:
+            kind = "exact" if fd["exact"] else f"approximate, {fd['violation_rate']:.1%} of rows violate"
+            ranked.append((fd["score"], f"{' + '.join(fd['lhs'])} -> {fd['rhs']} (functional dependency, {kind})"))
+        for ucc in results["unique_combinations"]:
+            ranked.append((0.9 if len(ucc["columns"]) > 1 else 0.5,
+                           f"({', '.join(ucc['columns'])}) uniquely identifies a row in the sample"))
+        for association in results["associations"]:
+            ranked.append((association["cramers_v"] * 0.8,
+                           f"{association['columns'][0]} ~ {association['columns'][1]} "
+                           f"(categorical association, Cramér's V {association['cramers_v']:.2f})"))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return [description for _, description in ranked[:limit]]
+
+    def _out_of_time(self):
+        if time.perf_counter() > self._deadline:
+            self.timed_out = True
+        return self.timed_out
+
+    def _partition(self, column_set, cache=True):
+        """Partition of the rows by the values of column_set, refined from a subset.
+
+        Only sets that can still be extended are cached, so memory stays at one
+        code array per surviving set below the top level.
+        """
+        if column_set in self._partitions:
+            return self._partitions[column_set]
+        columns = sorted(column_set, key=str)
+        base_codes, _ = self._partition(frozenset(columns[:-1]))
+        codes, groups = self._partitions[frozenset([columns[-1]])]
+        combined, _ = pd.factorize(base_codes * groups + codes)
+        partition = (combined.astype(np.int64), int(combined.max()) + 1 if len(combined) else 0)
+        if cache:
+            self._partitions[column_set] = partition
+        return partition
+
+    def _fd_error(self, lhs_codes, rhs):
+        """g3 error: the fraction of rows to remove for lhs -> rhs to hold exactly"""
+        rhs_codes, rhs_groups = self._partition(frozenset([rhs]))
+        pairs, counts = np.unique(lhs_codes * rhs_groups + rhs_codes, return_counts=True)
+        lhs_of_pair = pairs // rhs_groups
+        starts = np.flatnonzero(np.r_[True, lhs_of_pair[1:] != lhs_of_pair[:-1]])
+        kept = np.maximum.reduceat(counts, starts).sum()
+        return (self.n - kept) / self.n
+
+    def _discover_dependencies(self, columns):
+        functional_dependencies = []
+        unique_combinations = []
+        if self.n == 0:
+            return functional_dependencies, unique_combinations
+
+        cardinality = {column: self._partition(frozenset([column]))[1] for column in columns}
+        targets = [column for column in columns if cardinality[column] > 1]
+        keys = []
+        determined = {}  # rhs -> left-hand sides already found to determine it
+
+        level = [frozenset([column]) for column in columns]
+        for size in range(1, self.max_lhs_size + 1):
+            next_candidates = []
+            for lhs in level:
+                if self._out_of_time():
+                    return functional_dependencies, unique_combinations
+                # Supersets of a key are keys and make every dependency trivial
+                if any(key <= lhs for key in keys):
+                    continue
+                lhs_codes, groups = self._partition(lhs, cache=len(lhs) < self.max_lhs_size)
+                if groups == self.n:
+                    keys.append(lhs)
+                    # Continuous measures are unique by accident, not identifiers
+                    if not any(self.df[column].isna().any() or pd.api.types.is_float_dtype(self.df[column])
+                               for column in lhs):
+                        unique_combinations.append({"columns": sorted(lhs, key=str)})
+                    continue
+                next_candidates.append(lhs)
+                if groups > self.n * self.max_lhs_cardinality_ratio:
+                    continue
+                for rhs in targets:
+                    if rhs in lhs or any(found <= lhs for found in determined.get(rhs, [])):
+                        continue
+                    error = self._fd_error(lhs_codes, rhs)
+                    exact = error == 0
+                    if error <= self.max_error:
+                        determined.setdefault(rhs, []).append(lhs)
+                        functional_dependencies.append({
+                            "lhs": sorted(lhs, key=str),
+                            "rhs": rhs,
+                            "exact": exact,
+                            "violation_rate": round(error, 4),
+                            # Favor exact, small, low-cardinality left-hand sides over near-keys
+                            "score": round((1 - error) * (1 - groups / self.n) / len(lhs), 4)
+                        })
+            level = self._next_level(next_candidates, size)
+        functional_dependencies.sort(key=lambda fd: fd["score"], reverse=True)
+        return functional_dependencies, unique_combinations
+
+    @staticmethod
+    def _next_level(candidates, size):
+        # Apriori-style generation: keep a set only if all its subsets survived pruning
+        survivors = set(candidates)
+        next_level = set()
+        for first, second in combinations(candidates, 2):
+            union = first | second
+            if len(union) == size + 1 and all(union - {column} in survivors for column in union):
+                next_level.add(union)
+        return sorted(next_level, key=lambda column_set: sorted(map(str, column_set)))
+
+    def _categorical_associations(self, columns, min_cramers_v=0.3):
+        categorical = [column for column in columns
+                       if 1 < self._partition(frozenset([column]))[1] <= self.max_categories
+                       and not pd.api.types.is_float_dtype(self.df[column])]
+        associations = []
+        for first, second in combinations(categorical, 2):
+            if self._out_of_time():
+                break
+            cramers_v = self._cramers_v(first, second)
+            if cramers_v >= min_cramers_v:
+                associations.append({"columns": [first, second], "cramers_v": round(cramers_v, 4)})
+        associations.sort(key=lambda association: association["cramers_v"], reverse=True)
+        return associations
+
+    def _cramers_v(self, first, second):
+        first_codes, rows = self._partition(frozenset([first]))
+        second_codes, cols = self._partition(frozenset([second]))
+        table = np.bincount(first_codes * cols + second_codes, minlength=rows * cols).reshape(rows, cols)
+        expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / self.n
+        chi2 = ((table - expected) ** 2 / np.where(expected > 0, expected, 1)).sum()
+        return float(np.sqrt(chi2 / self.n / (min(rows, cols) - 1)))
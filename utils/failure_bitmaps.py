@@ -0,0 +1,290 @@
+import base64
+import sqlite3
+import struct
+
+import numpy as np
+
+from utils.rule_executor import TABLE_PLACEHOLDER, iter_executable_rules
+from utils.sketches import popcount
+
+# Containers with more values than this are stored as a 65536-bit bitmap
+ARRAY_LIMIT = 4096
+_MAGIC = b"RBM1"
+
+
+def _to_words(lows):
+    bits = np.zeros(65536, dtype=bool)
+    bits[lows] = True
+    return np.packbits(bits, bitorder="little").view("<u8")
+
+
+def _to_lows(words):
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder="little")).astype(np.uint16)
+
+
+def _test(words, lows):
+    return ((words[lows >> 6] >> (lows & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def _normalize(container):
+    """Keep each container in its cheaper form; None when empty"""
+    if container.dtype == np.uint16:
+        return container if len(container) else None
+    count = int(popcount(container).sum())
+    if count == 0:
+        return None
+    return _to_lows(container) if count <= ARRAY_LIMIT else container
+
+
+class RowBitmap:
+    """Compressed set of row positions, roaring-style.
+
+    Positions are split by their high 16 bits into containers of 65536 rows;
+    sparse containers hold a sorted uint16 array and dense ones a 1024-word
+    bitmap. AND/OR/ANDNOT work container by container on numpy arrays, so
+    combining two rules' failures never touches the rows themselves.
+    """
+
+    __slots__ = ("_containers",)
+
+    def __init__(self, containers=None):
+        self._containers = containers or {}
+
+    @classmethod
+    def from_positions(cls, positions):
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        containers = {}
+        if len(positions):
+            highs = positions >> 16
+            bounds = np.flatnonzero(np.diff(highs)) + 1
+            for chunk in np.split(positions, bounds):
+                lows = (chunk & 0xFFFF).astype(np.uint16)
+                containers[int(chunk[0] >> 16)] = lows if len(lows) <= ARRAY_LIMIT else _to_words(lows)
+        return cls(containers)
+
+    @classmethod
+    def full(cls, row_count):
+        """Every position in [0, row_count)"""
+        return cls.from_positions(np.arange(row_count))
+
+    def __len__(self):
+        return sum(len(c) if c.dtype == np.uint16 else int(popcount(c).sum()) for c in self._containers.values())
+
+    def __contains__(self, position):
+        container = self._containers.get(position >> 16)
+        if container is None:
+            return False
+        low = position & 0xFFFF
+        if container.dtype == np.uint16:
+            index = np.searchsorted(container, low)
+            return index < len(container) and container[index] == low
+        return bool(_test(container, np.array([low], dtype=np.uint16))[0])
+
+    def __eq__(self, other):
+        return (isinstance(other, RowBitmap) and self._containers.keys() == other._containers.keys()
+                and all(np.array_equal(c, other._containers[h]) for h, c in self._containers.items()))
+
+    def to_array(self):
+        """Sorted row positions as int64"""
+        parts = []
+        for high in sorted(self._containers):
+            container = self._containers[high]
+            lows = container if container.dtype == np.uint16 else _to_lows(container)
+            parts.append(lows.astype(np.int64) + (high << 16))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def __and__(self, other):
+        containers = {}
+        for high in self._containers.keys() & other._containers.keys():
+            a, b = self._containers[high], other._containers[high]
+            if a.dtype == np.uint16 and b.dtype == np.uint16:
+                result = np.intersect1d(a, b, assume_unique=True)
+            elif a.dtype == np.uint16:
+                result = a[_test(b, a)]
+            elif b.dtype == np.uint16:
+                result = b[_test(a, b)]
+            else:
+                result = a & b
+            result = _normalize(result)
+            if result is not None:
+                containers[high] = result
+        return RowBitmap(containers)
+
+    def __or__(self, other):
+        containers = dict(self._containers)
+        for high, b in other._containers.items():
+            a = containers.get(high)
+            if a is None:
+                containers[high] = b
+                continue
+            if a.dtype == np.uint16 and b.dtype == np.uint16:
+                result = np.union1d(a, b)
+                containers[high] = result if len(result) <= ARRAY_LIMIT else _to_words(result)
+            else:
+                words_a = a if a.dtype != np.uint16 else _to_words(a)
+                words_b = b if b.dtype != np.uint16 else _to_words(b)
+                containers[high] = words_a | words_b
+        return RowBitmap(containers)
+
+    def __sub__(self, other):
+        containers = {}
+        for high, a in self._containers.items():
+            b = other._containers.get(high)
+            if b is None:
+                containers[high] = a
+                continue
+            if a.dtype == np.uint16 and b.dtype == np.uint16:
+                result = np.setdiff1d(a, b, assume_unique=True)
+            elif a.dtype == np.uint16:
+                result = a[~_test(b, a)]
+            else:
+                result = a & ~(b if b.dtype != np.uint16 else _to_words(b))
+            result = _normalize(result)
+            if result is not None:
+                containers[high] = result
+        return RowBitmap(containers)
+
+    @classmethod
+    def union(cls, bitmaps):
+        result = cls()
+        for bitmap in bitmaps:
+            result = result | bitmap
+        return result
+
+    @classmethod
+    def intersection(cls, bitmaps):
+        """Smallest first, so the running result shrinks as early as possible"""
+        bitmaps = sorted(bitmaps, key=len)
+        if not bitmaps:
+            return cls()
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            if not result._containers:
+                break
+            result = result & bitmap
+        return result
+
+    def to_bytes(self):
+        """Header, then per container: high bits, kind (0=array, 1=bitmap), length, payload"""
+        parts = [_MAGIC, struct.pack("<I", len(self._containers))]
+        for high in sorted(self._containers):
+            container = self._containers[high]
+            is_array = container.dtype == np.uint16
+            parts.append(struct.pack("<QBI", high, 0 if is_array else 1, len(container)))
+            parts.append(container.astype("<u2" if is_array else "<u8").tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != _MAGIC:
+            raise ValueError("Not a serialized RowBitmap")
+        (count,), offset = struct.unpack_from("<I", data, 4), 8
+        containers = {}
+        for _ in range(count):
+            high, kind, length = struct.unpack_from("<QBI", data, offset)
+            offset += struct.calcsize("<QBI")
+            dtype, width = ("<u2", 2) if kind == 0 else ("<u8", 8)
+            container = np.frombuffer(data, dtype=dtype, count=length, offset=offset)
+            containers[high] = container.astype(np.uint16 if kind == 0 else np.uint64)
+            offset += length * width
+        return cls(containers)
+
+
+class FailureBitmaps:
+    """Violating row positions of every rule in one run.
+
+    Built once from a RuleExecutor; triage questions (rows failing both of
+    two rules, rows failing any completeness rule, the worst rows overall)
+    are then answered from the bitmaps without re-running any SQL.
+    """
+
+    def __init__(self, row_count):
+        self.row_count = row_count
+        self.bitmaps = {}
+        self.categories = {}
+        self.errors = {}
+
+    @classmethod
+    def build(cls, rule_executor, rules, table=TABLE_PLACEHOLDER):
+        """Run every executable rule once.
+
+        Rules whose SQL fails, and rules that read other tables (such as
+        referential-integrity joins) and so do not flag rows of `table`, end
+        up in .errors instead of as bitmaps.
+        """
+        failure_bitmaps = cls(rule_executor.row_count(table))
+        for rule_id, category, rule in iter_executable_rules(rules):
+            try:
+                positions = rule_executor.violating_row_ids(rule, table)
+            except (sqlite3.Error, ValueError) as e:
+                failure_bitmaps.errors[rule_id] = str(e)
+                continue
+            failure_bitmaps.add(rule_id, category, positions)
+        return failure_bitmaps
+
+    def add(self, rule_id, category, positions):
+        self.bitmaps[rule_id] = RowBitmap.from_positions(positions)
+        self.categories[rule_id] = category
+
+    def count(self, rule_id):
+        return len(self.bitmaps[rule_id])
+
+    def rules_in_category(self, category):
+        return [rule_id for rule_id, rule_category in self.categories.items() if rule_category == category]
+
+    def failing_all(self, rule_ids):
+        return RowBitmap.intersection([self.bitmaps[rule_id] for rule_id in rule_ids])
+
+    def failing_any(self, rule_ids=None):
+        """Rows failing at least one of the rules (all rules by default)"""
+        rule_ids = self.bitmaps if rule_ids is None else rule_ids
+        return RowBitmap.union([self.bitmaps[rule_id] for rule_id in rule_ids])
+
+    def failing_category(self, category):
+        return self.failing_any(self.rules_in_category(category))
+
+    def passing_all(self):
+        return RowBitmap.full(self.row_count) - self.failing_any()
+
+    def failure_counts(self):
+        """Number of rules each row fails"""
+        counts = np.zeros(self.row_count, dtype=np.int32)
+        for bitmap in self.bitmaps.values():
+            counts[bitmap.to_array()] += 1
+        return counts
+
+    def row_scores(self):
+        """Per-row quality score in [0, 1]: the share of rules the row passes"""
+        if not self.bitmaps:
+            return np.ones(self.row_count)
+        return 1 - self.failure_counts() / len(self.bitmaps)
+
+    def worst_rows(self, limit=10):
+        """(row position, rules failed) for the rows failing the most rules"""
+        counts = self.failure_counts()
+        top = np.argsort(-counts, kind="stable")[:min(limit, int(np.count_nonzero(counts)))]
+        return [(int(position), int(counts[position])) for position in top]
+
+    def to_dict(self):
+        """JSON-friendly form (bitmaps base64-encoded) to ship next to the KPI report"""
+        return {
+            "row_count": self.row_count,
+            "rules": {
+                rule_id: {
+                    "category": self.categories[rule_id],
+                    "violating_rows": len(bitmap),
+                    "bitmap": base64.b64encode(bitmap.to_bytes()).decode("ascii")
+                }
+                for rule_id, bitmap in self.bitmaps.items()
+            },
+            "errors": self.errors
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        failure_bitmaps = cls(data["row_count"])
+        for rule_id, entry in data["rules"].items():
+            failure_bitmaps.bitmaps[rule_id] = RowBitmap.from_bytes(base64.b64decode(entry["bitmap"]))
+            failure_bitmaps.categories[rule_id] = entry["category"]
+        failure_bitmaps.errors = dict(data.get("errors", {}))
+        return failure_bitmaps
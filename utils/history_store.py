@@ -0,0 +1,250 @@
+import hashlib
+import os
+import uuid
+from datetime import datetime, timezone
+
+DEFAULT_HISTORY_DIR = "dq_history"
+
+RUN_METRICS = [
+    "total_rules",
+    "rules_with_sql",
+    "sql_coverage_percentage",
+    "quality_score",
+    "simple_rules",
+    "complex_rules",
+    "cross_column_rules",
+    "total_violations",
+    "failing_rules"
+]
+# Metrics where going up is a regression
+LOWER_IS_BETTER = {"total_violations", "failing_rules"}
+
+
+def dataset_fingerprint(df):
+    """Stable id for a dataset's layout (column names and dtypes), not its values"""
+    layout = "\n".join(f"{column}:{dtype}" for column, dtype in df.dtypes.items())
+    return hashlib.sha1(layout.encode("utf-8")).hexdigest()[:16]
+
+
+def rule_key(category, pseudo_sql=None, text=None):
+    """Content key of a rule (category plus normalized SQL, else text).
+
+    Rule ids are positional and change whenever rules are regenerated, so
+    violation counts are compared across runs by this key instead.
+    """
+    body = " ".join((pseudo_sql or text or "").lower().split()).rstrip(";").strip()
+    return hashlib.sha1(f"{category}\n{body}".encode("utf-8")).hexdigest()[:16]
+
+
+def _runs_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [("run_id", pa.string()), ("timestamp", pa.timestamp("us", tz="UTC")), ("row_count", pa.int64())]
+        + [(metric, pa.float64() if metric in ("sql_coverage_percentage", "quality_score") else pa.int64())
+           for metric in RUN_METRICS]
+    )
+
+
+def _violations_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("run_id", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("rule_id", pa.string()),
+        ("rule_key", pa.string()),
+        ("category", pa.string()),
+        ("rule", pa.string()),
+        ("violating_rows", pa.int64()),
+        ("violation_rate", pa.float64())
+    ])
+
+
+class HistoryStore:
+    """Append-only history of KPI metrics and per-rule violation counts.
+
+    Every run writes one small Parquet file per table under
+    <root>/<runs|violations>/dataset=<fingerprint>/month=YYYY-MM/, and files
+    are never rewritten. Queries open only the fingerprint's directory, prune
+    months by partition and read just the columns they use.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("DQ_HISTORY_DIR", DEFAULT_HISTORY_DIR)
+
+    def record_run(self, fingerprint, kpi_analyzer, violation_counts=None, rules=None, timestamp=None):
+        """Append one run; returns its run id.
+
+        violation_counts maps rule_id -> violating rows (rules that could not
+        run are simply left out); rules supplies their category and text.
+        """
+        import pyarrow as pa
+
+        timestamp = (timestamp or datetime.now(timezone.utc)).astimezone(timezone.utc)
+        run_id = f"{timestamp:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        kpi_data = kpi_analyzer.kpi_data
+        row_count = kpi_data.get("data_context", {}).get("total_rows")
+
+        run = {
+            "run_id": run_id,
+            "timestamp": timestamp,
+            "row_count": row_count,
+            "total_rules": kpi_data["total_rules"],
+            "rules_with_sql": kpi_data["rules_with_sql"],
+            "sql_coverage_percentage": float(kpi_data["sql_coverage_percentage"]),
+            "quality_score": float(kpi_analyzer.get_quality_score()),
+            "simple_rules": kpi_data["rule_complexity"]["simple_rules"],
+            "complex_rules": kpi_data["rule_complexity"]["complex_rules"],
+            "cross_column_rules": kpi_data["rule_complexity"]["cross_column_rules"],
+            "total_violations": sum(violation_counts.values()) if violation_counts is not None else None,
+            "failing_rules": sum(1 for count in violation_counts.values() if count) if violation_counts is not None else None
+        }
+        self._write("runs", fingerprint, timestamp, run_id, pa.Table.from_pylist([run], schema=_runs_schema()))
+
+        if violation_counts:
+            rows = []
+            for rule_id, count in violation_counts.items():
+                rule = rules.get(rule_id) if rules is not None else None
+                rows.append({
+                    "run_id": run_id,
+                    "timestamp": timestamp,
+                    "rule_id": rule_id,
+                    "rule_key": rule_key(rule.category.value, rule.pseudo_sql, rule.text) if rule is not None else None,
+                    "category": rule.category.value if rule is not None else None,
+                    "rule": rule.text if rule is not None else None,
+                    "violating_rows": count,
+                    "violation_rate": count / row_count if row_count else None
+                })
+            self._write("violations", fingerprint, timestamp, run_id,
+                        pa.Table.from_pylist(rows, schema=_violations_schema()))
+        return run_id
+
+    def trend(self, fingerprint, metrics=("quality_score", "sql_coverage_percentage", "total_violations"),
+              months=12, now=None):
+        """One row per run over the last `months` calendar months, oldest first"""
+        import pyarrow.dataset as ds
+
+        now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+        month_index = now.year * 12 + now.month - 1 - (months - 1)
+        since = f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+        columns = ["run_id", "timestamp"] + list(metrics)
+        dataset = self._dataset("runs", fingerprint)
+        if dataset is None:
+            return _runs_schema().empty_table().select(columns).to_pandas()
+        table = dataset.to_table(columns=columns, filter=ds.field("month") >= since)
+        return table.sort_by("timestamp").to_pandas()
+
+    def regressions(self, fingerprint, metrics=RUN_METRICS, tolerance=0.0):
+        """Metrics that got worse from the previous run to the latest one"""
+        runs = self._latest_runs("runs", fingerprint, ["run_id", "timestamp"] + list(metrics), 2)
+        if len(runs) < 2:
+            return []
+        previous, latest = runs.iloc[0], runs.iloc[1]
+        regressions = []
+        for metric in metrics:
+            if runs[metric].isna().any():
+                continue
+            change = float(latest[metric] - previous[metric])
+            worse = change > tolerance if metric in LOWER_IS_BETTER else change < -tolerance
+            if worse:
+                regressions.append({
+                    "metric": metric,
+                    "previous": float(previous[metric]),
+                    "latest": float(latest[metric]),
+                    "change": change
+                })
+        return regressions
+
+    def top_degraded_rules(self, fingerprint, limit=10):
+        """Rules whose violation count grew most between the two latest counted runs.
+
+        Rules are matched across the runs by rule_key, so a regenerated rule
+        set with different numbering still compares like with like.
+        """
+        violations = self._latest_runs(
+            "violations", fingerprint,
+            ["run_id", "timestamp", "rule_id", "rule_key", "category", "rule", "violating_rows"], 2
+        )
+        run_ids = violations["run_id"].unique()
+        if len(run_ids) < 2:
+            return []
+        # Runs recorded without rules (or before keys existed) have no key to match on
+        violations = violations.dropna(subset=["rule_key"])
+        previous = (violations[violations["run_id"] == run_ids[0]]
+                    .drop_duplicates("rule_key").set_index("rule_key")["violating_rows"])
+        latest = violations[violations["run_id"] == run_ids[1]].drop_duplicates("rule_key").set_index("rule_key")
+        # Rules absent from the previous run have no baseline to degrade from
+        latest = latest[latest.index.isin(previous.index)]
+        increase = latest["violating_rows"] - previous.reindex(latest.index)
+        degraded = latest.assign(previous_rows=previous.reindex(latest.index), increase=increase)
+        degraded = degraded[degraded["increase"] > 0].nlargest(limit, "increase")
+        return [
+            {
+                "rule_id": row["rule_id"],
+                "rule_key": key,
+                "category": row["category"],
+                "rule": row["rule"],
+                "previous_rows": int(row["previous_rows"]),
+                "latest_rows": int(row["violating_rows"]),
+                "increase": int(row["increase"])
+            }
+            for key, row in degraded.iterrows()
+        ]
+
+    def _directory(self, table, fingerprint):
+        return os.path.join(self.root, table, f"dataset={fingerprint}")
+
+    def _write(self, table, fingerprint, timestamp, run_id, data):
+        import pyarrow.parquet as pq
+
+        directory = os.path.join(self._directory(table, fingerprint), f"month={timestamp:%Y-%m}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{run_id}.parquet")
+        # Readers never see a half-written file
+        pq.write_table(data, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def _dataset(self, table, fingerprint, months=None):
+        """The fingerprint's files as a dataset; all months (with a month column) or just `months`"""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        schema = _runs_schema() if table == "runs" else _violations_schema()
+        directory = self._directory(table, fingerprint)
+        if not os.path.isdir(directory):
+            return None
+        if months is None:
+            return ds.dataset(
+                directory,
+                schema=schema.append(pa.field("month", pa.string())),
+                format="parquet",
+                partitioning=ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+            )
+        files = [
+            os.path.join(directory, f"month={month}", name)
+            for month in months
+            for name in os.listdir(os.path.join(directory, f"month={month}"))
+            if name.endswith(".parquet")
+        ]
+        return ds.dataset(files, schema=schema, format="parquet")
+
+    def _latest_runs(self, table, fingerprint, columns, count):
+        """Rows of the `count` most recent runs, oldest first, reading months newest-first until found"""
+        directory = self._directory(table, fingerprint)
+        months = sorted((name.split("=", 1)[1] for name in os.listdir(directory) if name.startswith("month=")),
+                        reverse=True) if os.path.isdir(directory) else []
+        if not months:
+            schema = _runs_schema() if table == "runs" else _violations_schema()
+            return schema.empty_table().select(columns).to_pandas()
+
+        for scanned in range(1, len(months) + 1):
+            data = self._dataset(table, fingerprint, months[:scanned]).to_table(columns=columns)
+            runs = data.select(["run_id", "timestamp"]).group_by("run_id").aggregate([("timestamp", "max")])
+            if runs.num_rows >= count:
+                break
+        latest = runs.sort_by([("timestamp_max", "descending")]).column("run_id").to_pylist()[:count]
+        frame = data.to_pandas()
+        frame = frame[frame["run_id"].isin(latest)]
+        order = {run_id: index for index, run_id in enumerate(reversed(latest))}
+        return frame.sort_values("run_id", key=lambda ids: ids.map(order), kind="stable").reset_index(drop=True)
@@ -1,10 +1,70 @@
 import json
 from datetime import datetime
-from collections import defaultdict
-import pandas as pd
+
+from utils.rule_model import RuleSet
+
+
+class _CoverageIndex:
+    """Rule counts per column, kept ordered by count.
+
+    Columns live in buckets keyed by their count, so adding or removing a rule
+    moves each of its columns to the neighbouring bucket in O(1) and the most
+    covered column is always known without a sort.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self._buckets = {}
+        self.max_count = 0
+
+    def increment(self, column):
+        count = self.counts.get(column, 0)
+        self._discard(column, count)
+        self.counts[column] = count + 1
+        self._buckets.setdefault(count + 1, {})[column] = None
+        self.max_count = max(self.max_count, count + 1)
+
+    def decrement(self, column):
+        count = self.counts[column]
+        self._discard(column, count)
+        if count == 1:
+            del self.counts[column]
+        else:
+            self.counts[column] = count - 1
+            self._buckets.setdefault(count - 1, {})[column] = None
+        if count == self.max_count and count not in self._buckets:
+            # Counts move by one, so the new maximum is right below the old one
+            self.max_count = count - 1
+
+    def _discard(self, column, count):
+        if count:
+            bucket = self._buckets[count]
+            del bucket[column]
+            if not bucket:
+                del self._buckets[count]
+
+    def top(self):
+        return next(iter(self._buckets[self.max_count])) if self.max_count else None
+
+    def ranked(self):
+        """(column, count) pairs, most covered first; only the distinct counts are sorted"""
+        for count in sorted(self._buckets, reverse=True):
+            for column in self._buckets[count]:
+                yield column, count
+
 
 class KPIAnalyzer:
+    """Rule KPIs that are maintained incrementally.
+
+    analyze_rules() loads a whole rule set; add_rule/remove_rule/update_rule
+    then adjust the counters for a single rule in O(1) (plus its columns), and
+    the derived breakdowns are cached until the next change.
+    """
+
     def __init__(self):
+        self._rules = {}
+        self._coverage = _CoverageIndex()
+        self._cache = {}
         self.kpi_data = {
             "generation_timestamp": None,
             "total_rules": 0,
@@ -18,7 +78,7 @@ class KPIAnalyzer:
                 "complex_rules": 0,
                 "cross_column_rules": 0
             },
-            "column_coverage": {},
+            "column_coverage": self._coverage.counts,
             "validation_types": {},
             "data_quality_dimensions": {
                 "accuracy": 0,
@@ -35,6 +95,8 @@ class KPIAnalyzer:
         self.kpi_data["generation_timestamp"] = datetime.now().isoformat()
         
         # Reset counters
+        self._rules = {}
+        self._coverage = _CoverageIndex()
         self.kpi_data["total_rules"] = 0
         self.kpi_data["rules_with_sql"] = 0
         self.kpi_data["rules_without_sql"] = 0
@@ -45,87 +107,128 @@ class KPIAnalyzer:
             "complex_rules": 0,
             "cross_column_rules": 0
         }
-        self.kpi_data["column_coverage"] = {}
+        self.kpi_data["column_coverage"] = self._coverage.counts
         self.kpi_data["validation_types"] = {}
-        
-        # Analyze each category
-        for category, rule_list in rules.items():
-            if not isinstance(rule_list, list):
-                continue
-                
-            category_count = len(rule_list)
-            self.kpi_data["rules_by_category"][category] = category_count
-            self.kpi_data["total_rules"] += category_count
-            
-            # Update data quality dimensions
-            if category in self.kpi_data["data_quality_dimensions"]:
-                self.kpi_data["data_quality_dimensions"][category] = category_count
-            
-            # Analyze individual rules
-            for rule in rule_list:
-                if isinstance(rule, dict):
-                    self._analyze_rule_details(rule, category)
-                else:
-                    # Simple string rule
-                    self.kpi_data["rule_complexity"]["simple_rules"] += 1
-        
-        # Calculate percentages and distributions
-        self._calculate_percentages()
+        for dimension in self.kpi_data["data_quality_dimensions"]:
+            self.kpi_data["data_quality_dimensions"][dimension] = 0
         
         # Add data context if available
+        self.kpi_data.pop("data_context", None)
         if data_analyzer:
             self._add_data_context(data_analyzer)
         
+        # Analyze each category; empty categories still count towards diversity
+        for category, rule_list in RuleSet.coerce(rules).items():
+            self.kpi_data["rules_by_category"][category.value] = 0
+            for rule in rule_list:
+                self._apply(rule, 1)
+        
+        self._refresh()
         return self.kpi_data
 
-    def _analyze_rule_details(self, rule, category):
+    def add_rule(self, rule):
+        """Count one rule in; re-adding a known rule id updates it instead"""
+        if rule.rule_id in self._rules:
+            self._apply(self._rules[rule.rule_id], -1)
+        self._apply(rule, 1)
+        self._refresh()
+
+    def remove_rule(self, rule_id):
+        """Take a rule back out of the KPIs; unknown ids are ignored"""
+        rule = self._rules.get(rule_id)
+        if rule is not None:
+            self._apply(rule, -1)
+            self._refresh()
+
+    def update_rule(self, rule):
+        """Replace the counted version of an edited rule (same rule_id)"""
+        self.add_rule(rule)
+
+    def __contains__(self, rule_id):
+        return rule_id in self._rules
+
+    def _apply(self, rule, sign):
+        """Add (sign=1) or subtract (sign=-1) one rule's contribution to every counter"""
+        if sign > 0:
+            self._rules[rule.rule_id] = rule
+        else:
+            del self._rules[rule.rule_id]
+
+        category = rule.category.value
+        self.kpi_data["rules_by_category"][category] = self.kpi_data["rules_by_category"].get(category, 0) + sign
+        self.kpi_data["total_rules"] += sign
+        
+        # Update data quality dimensions
+        if rule.category.is_dimension:
+            self.kpi_data["data_quality_dimensions"][category] += sign
+        
+        if rule.is_detailed:
+            self._analyze_rule_details(rule, sign)
+        else:
+            # Simple string rule
+            self.kpi_data["rule_complexity"]["simple_rules"] += sign
+
+    def _analyze_rule_details(self, rule, sign=1):
         """Analyze individual rule details"""
         # Check SQL presence
-        if rule.get('pseudo_sql') and rule.get('pseudo_sql') != 'No SQL code available':
-            self.kpi_data["rules_with_sql"] += 1
+        if rule.has_sql:
+            self.kpi_data["rules_with_sql"] += sign
         else:
-            self.kpi_data["rules_without_sql"] += 1
+            self.kpi_data["rules_without_sql"] += sign
         
         # Analyze rule complexity
-        columns = rule.get('columns', rule.get('columns_involved', []))
-        if isinstance(columns, str):
-            columns = [columns]
+        columns = rule.columns
         
-        if category == 'cross_column':
-            self.kpi_data["rule_complexity"]["cross_column_rules"] += 1
+        if rule.category.is_cross_column:
+            self.kpi_data["rule_complexity"]["cross_column_rules"] += sign
         elif len(columns) > 1:
-            self.kpi_data["rule_complexity"]["complex_rules"] += 1
+            self.kpi_data["rule_complexity"]["complex_rules"] += sign
         else:
-            self.kpi_data["rule_complexity"]["simple_rules"] += 1
+            self.kpi_data["rule_complexity"]["simple_rules"] += sign
         
         # Track column coverage
         for column in columns:
-            if column not in self.kpi_data["column_coverage"]:
-                self.kpi_data["column_coverage"][column] = 0
-            self.kpi_data["column_coverage"][column] += 1
+            if sign > 0:
+                self._coverage.increment(column)
+            else:
+                self._coverage.decrement(column)
         
         # Track validation types
-        validation_type = rule.get('type', rule.get('validation_type', 'unknown'))
-        if validation_type not in self.kpi_data["validation_types"]:
-            self.kpi_data["validation_types"][validation_type] = 0
-        self.kpi_data["validation_types"][validation_type] += 1
+        validation_types = self.kpi_data["validation_types"]
+        validation_type = rule.rule_type
+        validation_types[validation_type] = validation_types.get(validation_type, 0) + sign
+        if not validation_types[validation_type]:
+            del validation_types[validation_type]
+
+    def _refresh(self):
+        """Recompute the ratios that depend on the totals and drop cached breakdowns"""
+        self._calculate_percentages()
+        context = self.kpi_data.get("data_context")
+        if context:
+            total = self.kpi_data["total_rules"]
+            context["rules_per_column"] = round(total / context["total_columns"], 2) if context["total_columns"] > 0 else 0
+            context["rules_per_row"] = round(total / context["total_rows"], 4) if context["total_rows"] > 0 else 0
+        self._cache.clear()
+
+    def _cached(self, name, compute):
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
 
     def _calculate_percentages(self):
         """Calculate percentage distributions"""
         total = self.kpi_data["total_rules"]
-        if total == 0:
-            return
         
         # SQL coverage percentage
         self.kpi_data["sql_coverage_percentage"] = round(
             (self.kpi_data["rules_with_sql"] / total) * 100, 2
-        )
+        ) if total else 0
         
-        # Category distribution percentages
+        # Category distribution percentages (a handful of categories, not rules)
         for category, count in self.kpi_data["rules_by_category"].items():
             self.kpi_data["category_distribution"][category] = round(
                 (count / total) * 100, 2
-            )
+            ) if total else 0
 
     def _add_data_context(self, data_analyzer):
         """Add data context information to KPIs"""
@@ -134,22 +237,26 @@ class KPIAnalyzer:
             "total_rows": stats["row_count"],
             "total_columns": stats["column_count"],
             "columns_with_missing_values": sum(1 for v in stats["missing_values"].values() if v > 0),
-            "rules_per_column": round(self.kpi_data["total_rules"] / stats["column_count"], 2) if stats["column_count"] > 0 else 0,
-            "rules_per_row": round(self.kpi_data["total_rules"] / stats["row_count"], 4) if stats["row_count"] > 0 else 0
+            "rules_per_column": 0,
+            "rules_per_row": 0,
+            "missingness": data_analyzer.get_missingness_summary()
         }
 
     def get_summary_metrics(self):
         """Get key summary metrics for dashboard display"""
-        return {
+        return self._cached("summary", lambda: {
             "total_rules": self.kpi_data["total_rules"],
             "sql_coverage": f"{self.kpi_data['sql_coverage_percentage']}%",
             "top_category": max(self.kpi_data["rules_by_category"].items(), key=lambda x: x[1])[0] if self.kpi_data["rules_by_category"] else "N/A",
-            "most_covered_column": max(self.kpi_data["column_coverage"].items(), key=lambda x: x[1])[0] if self.kpi_data["column_coverage"] else "N/A",
+            "most_covered_column": self._coverage.top() or "N/A",
             "complexity_ratio": f"{self.kpi_data['rule_complexity']['complex_rules']}/{self.kpi_data['rule_complexity']['simple_rules']}"
-        }
+        })
 
     def get_category_breakdown(self):
         """Get detailed category breakdown for charts"""
+        return self._cached("categories", self._category_breakdown)
+
+    def _category_breakdown(self):
         categories = []
         counts = []
         percentages = []
@@ -167,30 +274,28 @@ class KPIAnalyzer:
 
     def get_validation_type_breakdown(self):
         """Get validation type breakdown"""
-        return {
+        return self._cached("validation_types", lambda: {
             "types": list(self.kpi_data["validation_types"].keys()),
             "counts": list(self.kpi_data["validation_types"].values())
-        }
+        })
 
     def get_column_coverage_analysis(self):
         """Get column coverage analysis"""
-        if not self.kpi_data["column_coverage"]:
-            return {"columns": [], "coverage": []}
-        
-        # Sort by coverage count
-        sorted_coverage = sorted(
-            self.kpi_data["column_coverage"].items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )
-        
+        return self._cached("coverage", self._column_coverage_analysis)
+
+    def _column_coverage_analysis(self):
+        # Already ordered by coverage count; no per-call sort over all columns
+        ranked = list(self._coverage.ranked())
         return {
-            "columns": [item[0] for item in sorted_coverage],
-            "coverage": [item[1] for item in sorted_coverage]
+            "columns": [item[0] for item in ranked],
+            "coverage": [item[1] for item in ranked]
         }
 
     def export_kpi_report(self):
         """Export comprehensive KPI report as JSON"""
+        return self._cached("report", self._kpi_report)
+
+    def _kpi_report(self):
         report = {
             "report_metadata": {
                 "generated_at": self.kpi_data["generation_timestamp"],
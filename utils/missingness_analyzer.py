@@ -0,0 +1,127 @@
+from collections import Counter
+
+import numpy as np
+
+from utils.sketches import popcount as _popcount
+
+
+class MissingnessAnalyzer:
+    """Null co-occurrence across columns from bit-packed null masks.
+
+    Each column's null mask is packed into 64-bit words (one bit per row), so
+    pairwise co-null counts are AND + popcount over words instead of a scan
+    of every row for every pair, computed in blocks of columns to bound
+    memory. Only columns that have nulls take part.
+    """
+
+    def __init__(self, df, max_block_bytes=64 * 1024 * 1024):
+        self.row_count = len(df)
+        self.max_block_bytes = max_block_bytes
+        null_counts = df.isnull().sum()
+        self.columns = [column for column in df.columns if null_counts[column] > 0]
+        self.null_counts = np.array([int(null_counts[column]) for column in self.columns], dtype=np.int64)
+        self.bitsets = self._pack(df)
+        self._co_null = None
+
+    def _pack(self, df):
+        word_bytes = -(-self.row_count // 64) * 8
+        bitsets = np.zeros((len(self.columns), word_bytes), dtype=np.uint8)
+        for index, column in enumerate(self.columns):
+            packed = np.packbits(df[column].isna().to_numpy())
+            bitsets[index, :len(packed)] = packed
+        return bitsets.view(np.uint64)
+
+    def co_null_counts(self):
+        """Matrix of rows where both columns are null (diagonal = null counts)"""
+        if self._co_null is None:
+            column_count, word_count = self.bitsets.shape
+            co_null = np.zeros((column_count, column_count), dtype=np.int64)
+            block = max(1, self.max_block_bytes // max(1, column_count * word_count * 8))
+            for start in range(0, column_count, block):
+                both = self.bitsets[start:start + block, np.newaxis, :] & self.bitsets[np.newaxis, :, :]
+                co_null[start:start + block] = _popcount(both).sum(axis=-1, dtype=np.int64)
+            self._co_null = co_null
+        return self._co_null
+
+    def rows_with_any_null(self):
+        if len(self.columns) == 0:
+            return 0
+        return int(_popcount(np.bitwise_or.reduce(self.bitsets, axis=0)).sum())
+
+    def null_implications(self, min_confidence=0.95, min_nulls=1):
+        """Pairs where A being null means B is (almost always) null too"""
+        co_null = self.co_null_counts()
+        implications = []
+        for a, column_a in enumerate(self.columns):
+            if self.null_counts[a] < min_nulls:
+                continue
+            for b, column_b in enumerate(self.columns):
+                if a == b:
+                    continue
+                confidence = co_null[a, b] / self.null_counts[a]
+                if confidence >= min_confidence:
+                    implications.append({
+                        "if_null": column_a,
+                        "then_null": column_b,
+                        "confidence": round(float(confidence), 4),
+                        "support_rows": int(co_null[a, b])
+                    })
+        implications.sort(key=lambda item: (item["confidence"], item["support_rows"]), reverse=True)
+        return implications
+
+    def co_null_pairs(self, min_jaccard=0.5):
+        """Column pairs whose null masks overlap strongly (Jaccard of the null rows)"""
+        co_null = self.co_null_counts()
+        pairs = []
+        for a in range(len(self.columns)):
+            for b in range(a + 1, len(self.columns)):
+                union = self.null_counts[a] + self.null_counts[b] - co_null[a, b]
+                jaccard = co_null[a, b] / union if union else 0.0
+                if jaccard >= min_jaccard:
+                    pairs.append({
+                        "columns": [self.columns[a], self.columns[b]],
+                        "co_null_rows": int(co_null[a, b]),
+                        "jaccard": round(float(jaccard), 4)
+                    })
+        pairs.sort(key=lambda item: item["jaccard"], reverse=True)
+        return pairs
+
+    def frequent_null_patterns(self, min_support=0.01, limit=10, chunk_rows=65536):
+        """Most common sets of columns that are null together in a row"""
+        if len(self.columns) == 0 or self.row_count == 0:
+            return []
+        # Row-major bits for a chunk of rows: unpack the column words, pack per row
+        bytes_per_column = self.bitsets.view(np.uint8)
+        counts = Counter()
+        for start in range(0, self.row_count, chunk_rows):
+            stop = min(start + chunk_rows, self.row_count)
+            byte_start, byte_stop = start // 8, -(-stop // 8)
+            bits = np.unpackbits(bytes_per_column[:, byte_start:byte_stop], axis=1)[:, :stop - start]
+            rows = np.packbits(bits.T, axis=1)
+            patterns, pattern_counts = np.unique(rows, axis=0, return_counts=True)
+            for pattern, count in zip(patterns, pattern_counts):
+                counts[pattern.tobytes()] += int(count)
+
+        patterns = []
+        for key, count in counts.most_common():
+            if count / self.row_count < min_support or len(patterns) >= limit:
+                break
+            mask = np.unpackbits(np.frombuffer(key, dtype=np.uint8))[:len(self.columns)].astype(bool)
+            if not mask.any():
+                continue
+            patterns.append({
+                "null_columns": [column for column, is_null in zip(self.columns, mask) if is_null],
+                "rows": count,
+                "share": round(count / self.row_count, 4)
+            })
+        return patterns
+
+    def summary(self, limit=10):
+        """Compact missingness overview for the rule prompt and the KPI report"""
+        return {
+            "columns_with_nulls": len(self.columns),
+            "rows_with_any_null": self.rows_with_any_null(),
+            "null_implications": self.null_implications()[:limit],
+            "co_null_pairs": self.co_null_pairs()[:limit],
+            "frequent_null_patterns": self.frequent_null_patterns(limit=limit)
+        }
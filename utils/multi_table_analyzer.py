@@ -0,0 +1,256 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.data_analyzer import DataAnalyzer
+from utils.sketches import MinHash, estimate_containment, hash_series
+
+# Last name tokens that mark a column as an identifier
+ID_SUFFIXES = {"id", "key", "code", "no", "num", "number", "ref"}
+# Name tokens of a column that points at another row of its own table
+SELF_REFERENCE_HINTS = {"parent", "manager", "supervisor", "reports", "referrer", "referred", "predecessor",
+                        "successor", "previous", "next"}
+
+
+def table_name_from_filename(filename):
+    """Turn an uploaded file name into a SQL-friendly table name"""
+    name = re.sub(r"\W+", "_", os.path.splitext(os.path.basename(filename))[0]).strip("_").lower()
+    if not name or name[0].isdigit():
+        name = f"t_{name}"
+    return name
+
+
+class KeyIndex:
+    """Sorted array of hashed key values, built once per parent key column."""
+
+    def __init__(self, series):
+        self.hashes = np.unique(hash_series(series))
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def contains(self, series):
+        """Boolean mask over the non-null values of `series` telling which exist in the index"""
+        hashes = hash_series(series)
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.searchsorted(self.hashes, hashes).clip(max=len(self.hashes) - 1)
+        return self.hashes[positions] == hashes
+
+
+class MultiTableAnalyzer:
+    """Profile several related tables and check referential integrity between them.
+
+    Key/foreign-key pairs are found from profile statistics: candidate keys are
+    complete, fully unique columns. A column in another table is a candidate
+    foreign key of a key when its name refers to the key (orders.customer_id
+    -> customers.customer_id or customers.id) or, failing that, when it is an
+    id-like text column (codes rarely coincide by chance, small integers do)
+    that is not itself a key; within one table only self-references such as
+    employees.manager_id qualify. Containment of the
+    child's distinct values in the key is computed exactly against a hashed
+    index of the key for up to `exact_check_limit` distinct values, and
+    estimated from MinHash sketches above that. The threshold is low on
+    purpose: orphaned foreign keys are what the checks report.
+    """
+
+    def __init__(self, tables, num_perm=128, containment_threshold=0.5, min_distinct=2, exact_check_limit=100000):
+        self.tables = tables
+        self.analyzers = {name: DataAnalyzer(df) for name, df in tables.items()}
+        self.num_perm = num_perm
+        self.containment_threshold = containment_threshold
+        self.min_distinct = min_distinct
+        self.exact_check_limit = exact_check_limit
+        self._profiles = None
+        self._signatures = {}
+        self._key_indexes = {}
+
+    def get_table_profiles(self):
+        if self._profiles is None:
+            self._profiles = {name: analyzer.generate_column_profiles()
+                              for name, analyzer in self.analyzers.items()}
+        return self._profiles
+
+    def get_table_summaries(self):
+        return {name: self.analyzers[name].get_basic_stats() for name in self.tables}
+
+    def find_candidate_keys(self):
+        """Columns that are complete and unique in their table"""
+        keys = {}
+        for name, profiles in self.get_table_profiles().items():
+            row_count = len(self.tables[name])
+            keys[name] = [
+                column for column, profile in profiles.items()
+                if row_count > 0 and profile["missing_count"] == 0
+                and _is_key_dtype(self.tables[name][column])
+                and self._is_unique(name, column, profile, row_count)
+            ]
+        return keys
+
+    def _is_unique(self, table, column, profile, row_count):
+        error = profile.get("unique_count_relative_error")
+        if error is None:
+            return profile["unique_count"] == row_count
+        # Large text columns carry a HyperLogLog estimate; confirm near-unique ones exactly
+        if abs(profile["unique_count"] - row_count) > 3 * error * row_count:
+            return False
+        return bool(self.tables[table][column].is_unique)
+
+    def find_foreign_key_candidates(self):
+        """Key-like columns whose distinct values are mostly contained in a candidate key"""
+        profiles = self.get_table_profiles()
+        candidate_keys = self.find_candidate_keys()
+        candidates = []
+        for parent_table, key_columns in candidate_keys.items():
+            for parent_column in key_columns:
+                parent_series = self.tables[parent_table][parent_column]
+                parent_distinct = len(self.tables[parent_table])
+                for child_table, child_df in self.tables.items():
+                    for child_column in child_df.columns:
+                        if child_table == parent_table and child_column == parent_column:
+                            continue
+                        child_series = child_df[child_column]
+                        child_profile = profiles[child_table][child_column]
+                        child_distinct = child_profile["unique_count"]
+                        # Orphans add distinct values; beyond this the threshold cannot be met
+                        slack = (1 + 3 * child_profile.get("unique_count_relative_error", 0)) / self.containment_threshold
+                        if child_distinct < self.min_distinct or child_distinct > parent_distinct * slack:
+                            continue
+                        if not _compatible(child_series, parent_series) or not _is_key_dtype(child_series):
+                            continue
+                        if not _is_reference(child_table, child_column, child_series, parent_table, parent_column,
+                                             child_column in candidate_keys[child_table]):
+                            continue
+                        containment = self._containment(child_table, child_column, child_distinct,
+                                                        parent_table, parent_column, parent_distinct)
+                        if containment >= self.containment_threshold:
+                            candidates.append({
+                                "child_table": child_table,
+                                "child_column": child_column,
+                                "parent_table": parent_table,
+                                "parent_column": parent_column,
+                                "estimated_containment": round(containment, 4)
+                            })
+        candidates.sort(key=lambda c: c["estimated_containment"], reverse=True)
+        return candidates
+
+    def _containment(self, child_table, child_column, child_distinct, parent_table, parent_column, parent_distinct):
+        """Share of the child's distinct values found in the key; exact for small children"""
+        if child_distinct <= self.exact_check_limit:
+            values = self.tables[child_table][child_column].dropna().drop_duplicates()
+            return float(self._key_index(parent_table, parent_column).contains(values).mean()) if len(values) else 0.0
+        # A MinHash estimate is only meaningful when the two sets are of similar size
+        jaccard = self._signature(child_table, child_column).jaccard(self._signature(parent_table, parent_column))
+        return estimate_containment(jaccard, child_distinct, parent_distinct)
+
+    def check_foreign_keys(self, candidates=None, sample_size=5):
+        """Exactly count orphaned child values for each candidate foreign key"""
+        if candidates is None:
+            candidates = self.find_foreign_key_candidates()
+        results = []
+        for candidate in candidates:
+            index = self._key_index(candidate["parent_table"], candidate["parent_column"])
+            child_values = self.tables[candidate["child_table"]][candidate["child_column"]].dropna()
+            found = index.contains(child_values)
+            orphans = child_values[~found]
+            results.append({
+                **candidate,
+                "checked_rows": int(len(child_values)),
+                "orphan_rows": int(len(orphans)),
+                "orphan_distinct": int(orphans.nunique()),
+                "orphan_sample": orphans.drop_duplicates().head(sample_size).tolist(),
+                "containment": round(float(found.mean()), 4) if len(found) else 1.0
+            })
+        return results
+
+    def generate_referential_integrity_rules(self):
+        """Rules in the same shape as the generated ones, for the referential_integrity category"""
+        rules = []
+        for fk in self.check_foreign_keys():
+            child, parent = fk["child_table"], fk["parent_table"]
+            child_column, parent_column = fk["child_column"], fk["parent_column"]
+            rules.append({
+                "rule": f"Every non-null {child}.{child_column} must reference an existing {parent}.{parent_column}.",
+                "columns": [child_column],
+                "type": "foreign_key",
+                "tables": [child, parent],
+                "orphan_rows": fk["orphan_rows"],
+                "orphan_sample": fk["orphan_sample"],
+                "pseudo_sql": (
+                    f"SELECT c.* FROM {child} c LEFT JOIN {parent} p ON c.{child_column} = p.{parent_column} "
+                    f"WHERE c.{child_column} IS NOT NULL AND p.{parent_column} IS NULL"
+                )
+            })
+        return rules
+
+    def _signature(self, table, column):
+        if (table, column) not in self._signatures:
+            self._signatures[(table, column)] = MinHash.from_series(
+                self.tables[table][column], num_perm=self.num_perm
+            )
+        return self._signatures[(table, column)]
+
+    def _key_index(self, table, column):
+        if (table, column) not in self._key_indexes:
+            self._key_indexes[(table, column)] = KeyIndex(self.tables[table][column])
+        return self._key_indexes[(table, column)]
+
+
+def _name_tokens(name):
+    """Lowercase words of a column or table name; "CustomerID" and "customerid" end in "id" too"""
+    tokens = re.findall(r"[a-z0-9]+", re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", str(name)).lower())
+    if tokens and tokens[-1] not in ID_SUFFIXES and tokens[-1].endswith("id") and len(tokens[-1]) > 2:
+        tokens[-1:] = [tokens[-1][:-2], "id"]
+    return tokens
+
+
+def _singular(word):
+    if word.endswith("ies") and len(word) > 3:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _names_match(child_column, parent_table, parent_column):
+    """Whether the child's name points at the key: same name, a prefixed form of it
+    (billing_customer_id), or <table>_<key> for a generic key (customer_id -> customers.id)"""
+    child, parent = _name_tokens(child_column), _name_tokens(parent_column)
+    if not child or child[-1] not in ID_SUFFIXES:
+        return child == parent
+    if len(parent) > 1 and child[-len(parent):] == parent:
+        return True
+    table = [_singular(token) for token in _name_tokens(parent_table)]
+    stem = [_singular(token) for token in child[:-1]]
+    return len(parent) == 1 and bool(table) and stem[-len(table):] == table
+
+
+def _is_reference(child_table, child_column, child_series, parent_table, parent_column, child_is_key):
+    """Whether a child column is worth checking as a foreign key of the parent key"""
+    tokens = _name_tokens(child_column)
+    id_like = bool(tokens) and tokens[-1] in ID_SUFFIXES
+    if child_table == parent_table:
+        return id_like and not child_is_key and any(token in SELF_REFERENCE_HINTS for token in tokens)
+    if _names_match(child_column, parent_table, parent_column):
+        return True
+    # Without a name match only text codes count: small integer ids overlap by
+    # chance, and a differently named key of another table is not a reference
+    return id_like and not child_is_key and not pd.api.types.is_numeric_dtype(child_series)
+
+
+def _is_key_dtype(series):
+    # Booleans and fractional floats are never keys; integral floats are ints read with NaNs
+    if pd.api.types.is_bool_dtype(series):
+        return False
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        return bool((values == values.round()).all())
+    return True
+
+
+def _compatible(child, parent):
+    child_numeric = pd.api.types.is_numeric_dtype(child) and not pd.api.types.is_bool_dtype(child)
+    parent_numeric = pd.api.types.is_numeric_dtype(parent) and not pd.api.types.is_bool_dtype(parent)
+    return child_numeric == parent_numeric
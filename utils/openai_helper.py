@@ -1,22 +1,41 @@
 import os
-from openai import OpenAI
 import json
 
+from utils.prompt_encoder import DEFAULT_TOKEN_BUDGET, PromptEncoder
+
 # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
 # do not change this unless explicitly requested by the user
 class OpenAIHelper:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET):
+        self._client = None
         self.model = "gpt-4o-mini"
-
-    def analyze_data_sample(self, data_sample, column_info, user_context=""):
+        # Compact, token-budgeted encoding of the data in each prompt
+        self.encoder = PromptEncoder(token_budget, self.model)
+
+    @property
+    def client(self):
+        # The openai package is slow to import; defer it until the first API call
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        return self._client
+
+    def analyze_data_sample(self, data_sample, column_info, user_context="", categories=None):
         context_prompt = f"\nAdditional context about the data: {user_context}" if user_context else ""
+        if categories:
+            # Retry of specific categories: ask for those alone to keep the completion small
+            context_prompt += (f"\nIMPORTANT: Only generate rules for these categories: {', '.join(categories)}. "
+                               f"The \"rules\" object must contain exactly these keys.")
 
-        prompt = f"""You are a data quality expert. Your task is to analyze the provided data and generate data quality rules with SQL code.
+        def render(data):
+            return f"""You are a data quality expert. Your task is to analyze the provided data and generate data quality rules with SQL code.
 
         STEP 1: Analyze this data sample and column information:
-        {data_sample}
-        {column_info}{context_prompt}
+{data}{context_prompt}
+        For numeric and date columns, base range thresholds on the percentiles (p1/p99) and
+        histogram rather than the raw min/max, which outliers distort.
+        Use the missingness section (null implications and patterns of columns that are null
+        together) for completeness and conditional-null rules such as "if A is null then B is null".
 
         STEP 2: For each rule you generate, you MUST include these 4 fields:
         - "rule": A clear description of the validation rule
@@ -76,6 +95,13 @@ class OpenAIHelper:
             }}
         }}"""
 
+        prompt = self.encoder.fit(
+            "analyze_data_sample",
+            render,
+            lambda level: self.encoder.encode_analysis_payload(data_sample, column_info, level),
+            f"        {data_sample}\n        {column_info}"
+        )
+
         response = self.client.chat.completions.create(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
@@ -84,14 +110,18 @@ class OpenAIHelper:
 
         return json.loads(response.choices[0].message.content)
 
-    def suggest_cross_column_rules(self, column_names, sample_correlations, user_context=""):
+    def suggest_cross_column_rules(self, column_names, sample_correlations, user_context="", dependencies=None):
         context_prompt = f"\nAdditional context about the data: {user_context}" if user_context else ""
+        dependency_prompt = ""
+        if dependencies:
+            dependency_lines = "\n".join(f"        - {dependency}" for dependency in dependencies)
+            dependency_prompt = f"\n        Relationships discovered in the data (strongest first):\n{dependency_lines}"
 
-        prompt = f"""You are a data quality expert. Generate cross-column validation rules with SQL code.
+        def render(data):
+            return f"""You are a data quality expert. Generate cross-column validation rules with SQL code.
 
         STEP 1: Analyze these columns and their relationships:
-        Columns: {column_names}
-        Correlations: {sample_correlations}{context_prompt}
+{data}{context_prompt}
 
         STEP 2: For each cross-column rule, you MUST include these 4 fields:
         - "rule": A clear description of the cross-column validation
@@ -99,7 +129,8 @@ class OpenAIHelper:
         - "validation_type": The type of validation (logical, business, temporal, etc.)
         - "pseudo_sql": A complete SQL query that finds violations
 
-        STEP 3: Focus on these relationship types:
+        STEP 3: Prefer rules that enforce the discovered relationships (e.g. a functional dependency
+        A -> B means each A value must map to a single B value). Also consider:
         - Logical dependencies (if A then B)
         - Mathematical relationships (A > B, A + B = C)
         - Business rules (age requirements, salary constraints)
@@ -134,6 +165,13 @@ class OpenAIHelper:
             ]
         }}"""
 
+        prompt = self.encoder.fit(
+            "suggest_cross_column_rules",
+            render,
+            lambda level: self.encoder.encode_cross_column_payload(column_names, sample_correlations, dependencies, level),
+            f"        Columns: {column_names}\n        Correlations: {sample_correlations}{dependency_prompt}"
+        )
+
         response = self.client.chat.completions.create(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
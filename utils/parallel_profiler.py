@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.data_analyzer import DataAnalyzer
+
+
+class ParallelProfilingUnavailable(ValueError):
+    """The frame cannot be shared with workers as an Arrow file; profile it serially instead"""
+
+
+def parallel_profiling_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _profile_columns(path, columns, options):
+    """Worker: profile a group of columns read from the shared Arrow file"""
+    import pyarrow as pa
+
+    # The memory map is shared with every other worker through the page cache;
+    # only the selected columns are materialized as pandas objects here
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all().select(columns)
+        df = table.to_pandas(split_blocks=True)
+    analyzer = DataAnalyzer(df, **options)
+    return {column: analyzer.profile_column(column) for column in columns}
+
+
+class ParallelProfiler:
+    """Profile the columns of a DataFrame across a process pool.
+
+    The frame is written once to an Arrow IPC file that each worker memory-maps,
+    so workers read the data zero-copy instead of receiving pickled DataFrame
+    copies. Columns are split into groups, profiled independently and the
+    partial profiles are merged back in the original column order.
+    """
+
+    def __init__(self, df, max_workers=None, tasks_per_worker=4, start_method="spawn", **analyzer_options):
+        self.df = df
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.tasks_per_worker = tasks_per_worker
+        self.start_method = start_method
+        self.analyzer_options = analyzer_options
+
+    def generate_column_profiles(self):
+        import pyarrow as pa
+
+        columns = [str(column) for column in self.df.columns]
+        if len(set(columns)) != len(columns):
+            raise ParallelProfilingUnavailable("Parallel profiling requires unique column names")
+
+        with tempfile.TemporaryDirectory(prefix="dq_profile_") as directory:
+            path = os.path.join(directory, "data.arrow")
+            try:
+                table = pa.Table.from_pandas(self.df.rename(columns=str), preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                # Object columns mixing types (common from read_csv with low_memory)
+                raise ParallelProfilingUnavailable(f"Columns cannot be converted to Arrow: {e}") from e
+            with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            del table
+
+            partial_profiles = {}
+            context = multiprocessing.get_context(self.start_method)
+            with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as pool:
+                futures = [pool.submit(_profile_columns, path, group, self.analyzer_options)
+                           for group in self._column_groups(columns)]
+                for future in futures:
+                    partial_profiles.update(future.result())
+
+        # Merge partial profiles back under the original column labels and order
+        return {column: partial_profiles[str(column)] for column in self.df.columns}
+
+    def _column_groups(self, columns):
+        """Split columns into a few tasks per worker so slow columns balance out"""
+        task_count = max(1, min(len(columns), self.max_workers * self.tasks_per_worker))
+        return [columns[index::task_count] for index in range(task_count) if columns[index::task_count]]
@@ -0,0 +1,404 @@
+import argparse
+import base64
+import hmac
+import ipaddress
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import sqlite3
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import cycle
+
+from utils.rule_executor import (TABLE_PLACEHOLDER, RuleExecutor, is_row_local, is_row_local_filter,
+                                 iter_executable_rules, parse_unique_check)
+
+_FRAME = struct.Struct(">IQ")
+_NULL_KEY_HASH = 0x9E3779B97F4A7C15
+
+
+def plan_rules(rules, columns):
+    """Split rules by how they can be distributed.
+
+    row_filter rules are evaluated per partition and merged as counts and
+    min/max of the rule's columns; unique_key rules ship hashed keys bucketed
+    by hash so duplicates across partitions are found when buckets merge.
+    Anything else (joins with other tables, arbitrary aggregates, WHERE
+    clauses with subqueries, LIMIT or ORDER BY) is unpartitioned: its answer
+    needs the whole table in one place, which is what partitioning avoids.
+    """
+    specs = []
+    for rule_id, category, rule in iter_executable_rules(rules):
+        sql = rule.pseudo_sql.strip().rstrip(";")
+        spec = {"rule_id": rule_id, "category": category, "sql": sql}
+        unique_check = parse_unique_check(sql)
+        if is_row_local_filter(sql):
+            spec.update(kind="row_filter", columns=[column for column in rule.columns if column in columns])
+        elif (unique_check and all(key in columns for key in unique_check[0])
+              and is_row_local(unique_check[1])):
+            keys, where = unique_check
+            quoted_keys = ", ".join(f'"{key}"' for key in keys)
+            spec.update(kind="unique_key", columns=keys,
+                        key_sql=f'SELECT {quoted_keys} FROM "{TABLE_PLACEHOLDER}"{where}')
+        else:
+            spec.update(kind="unpartitioned")
+        specs.append(spec)
+    return specs
+
+
+def _key_hashes(keys):
+    """One 64-bit hash per row of key columns, equal for equal keys whatever the partition's dtypes.
+
+    SQLite hands back 1 or 1.0 for the same key depending on whether the
+    partition's column had a NULL, so every value is hashed in one canonical
+    form (sketches.normalize_values, with integral floats as ints value by
+    value). NULLs hash to a fixed value, since GROUP BY puts them in one group.
+    """
+    import numpy as np
+    import pandas as pd
+    from utils.sketches import _mix64, normalize_values
+
+    hashes = np.zeros(len(keys), dtype=np.uint64)
+    for column in keys.columns:
+        series = keys[column].reset_index(drop=True)
+        column_hashes = np.full(len(keys), _NULL_KEY_HASH, dtype=np.uint64)
+        values = normalize_values(series)
+        if pd.api.types.is_float_dtype(values):
+            integral = ((values == values.round()) & (values.abs() < 2 ** 63)).to_numpy()
+            column_hashes[values.index[integral]] = pd.util.hash_array(values[integral].astype("int64").to_numpy())
+            column_hashes[values.index[~integral]] = pd.util.hash_array(values[~integral].to_numpy())
+        else:
+            column_hashes[values.index] = pd.util.hash_array(values.to_numpy(), categorize=True)
+        hashes = _mix64(hashes ^ column_hashes)
+    return hashes
+
+
+def evaluate_partition(df, specs, num_buckets):
+    """Partial, mergeable results of the partitionable rules on one partition.
+
+    The result only holds JSON types (hash buckets are base64 strings) so the
+    same function serves the process pool and the socket workers.
+    """
+    import numpy as np
+    import pandas as pd
+
+    executor = RuleExecutor(df)
+    partial = {"rows": len(df), "rules": {}}
+    try:
+        for spec in specs:
+            try:
+                if spec["kind"] == "row_filter":
+                    aggregates = "".join(f', MIN("{column}"), MAX("{column}")' for column in spec["columns"])
+                    row = executor.connection.execute(f"SELECT COUNT(*){aggregates} FROM ({spec['sql']})").fetchone()
+                    partial["rules"][spec["rule_id"]] = {
+                        "violating_rows": row[0],
+                        "min": {column: row[1 + 2 * index] for index, column in enumerate(spec["columns"])},
+                        "max": {column: row[2 + 2 * index] for index, column in enumerate(spec["columns"])}
+                    }
+                elif spec["kind"] == "unique_key":
+                    keys = pd.DataFrame(executor.connection.execute(spec["key_sql"]).fetchall(),
+                                        columns=spec["columns"])
+                    hashes = _key_hashes(keys)
+                    buckets = hashes % np.uint64(num_buckets)
+                    partial["rules"][spec["rule_id"]] = {
+                        "keys": len(hashes),
+                        "buckets": {
+                            str(bucket): base64.b64encode(hashes[buckets == bucket].tobytes()).decode("ascii")
+                            for bucket in np.unique(buckets).tolist()
+                        }
+                    }
+            except sqlite3.Error as e:
+                partial["rules"][spec["rule_id"]] = {"error": str(e)}
+    finally:
+        executor.close()
+    return partial
+
+
+def _evaluate_range(path, start, stop, specs, num_buckets):
+    """Pool worker: a row range of the shared Arrow file"""
+    import pyarrow as pa
+
+    with pa.memory_map(path, "r") as source:
+        df = pa.ipc.open_file(source).read_all().slice(start, stop - start).to_pandas()
+    return evaluate_partition(df, specs, num_buckets)
+
+
+def _evaluate_file(path, specs, num_buckets):
+    """Pool or socket worker: one file partition (Parquet, Arrow IPC or CSV)"""
+    return evaluate_partition(_read_partition_file(path), specs, num_buckets)
+
+
+def _read_partition_file(path):
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith((".arrow", ".feather")):
+        return pd.read_feather(path)
+    return pd.read_csv(path)
+
+
+def _send_frame(sock, header, payload=b""):
+    """Frame: 4-byte JSON header length, 8-byte payload length, header, payload"""
+    header = json.dumps(header).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(header), len(payload)) + header + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-frame")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_frame(sock):
+    header_size, payload_size = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    return json.loads(_recv_exact(sock, header_size)), _recv_exact(sock, payload_size)
+
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _resolve_partition_path(path, data_root):
+    """Absolute path of a requested partition file, which must lie under the worker's data root"""
+    if data_root is None:
+        raise PermissionError("This worker has no data root and only accepts partitions sent inline")
+    resolved = os.path.realpath(os.path.join(data_root, path))
+    if os.path.commonpath([resolved, data_root]) != data_root:
+        raise PermissionError(f"{path} is outside the worker's data root")
+    return resolved
+
+
+class _WorkerServer(socketserver.ThreadingTCPServer):
+    def __init__(self, address, token=None, data_root=None):
+        super().__init__(address, _WorkerHandler)
+        self.token = token.encode("utf-8") if token else None
+        self.data_root = os.path.realpath(data_root) if data_root else None
+
+
+class _WorkerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        import pyarrow as pa
+
+        try:
+            request, payload = _recv_frame(self.request)
+        except ConnectionError:
+            # Health checks connect and hang up without sending a frame
+            return
+        try:
+            if self.server.token is not None and not hmac.compare_digest(
+                    str(request.get("token", "")).encode("utf-8"), self.server.token):
+                raise PermissionError("Invalid or missing worker token")
+            if request.get("path"):
+                path = _resolve_partition_path(request["path"], self.server.data_root)
+                partial = _evaluate_file(path, request["specs"], request["num_buckets"])
+            else:
+                df = pa.ipc.open_stream(payload).read_all().to_pandas()
+                partial = evaluate_partition(df, request["specs"], request["num_buckets"])
+            _send_frame(self.request, {"partial": partial})
+        except Exception as e:
+            _send_frame(self.request, {"error": f"{type(e).__name__}: {e}"})
+
+
+def serve(host="127.0.0.1", port=9750, token=None, data_root=None):
+    """Run a socket worker that evaluates partitions sent by a PartitionedExecutor.
+
+    When `token` is set, every request must carry it; a worker bound to a
+    non-loopback address refuses to start without one. Partition files are
+    only read from under `data_root` (relative paths resolve against it);
+    without a data root the worker only accepts partitions sent inline.
+    """
+    if token is None and not _is_loopback(host):
+        raise ValueError(f"Refusing to serve on {host} without a token; pass --token or set DQ_WORKER_TOKEN")
+    with _WorkerServer((host, port), token, data_root) as server:
+        server.serve_forever()
+
+
+class PartitionedExecutor:
+    """Evaluate a rule set partition by partition and merge the partial results.
+
+    The data is a DataFrame split into row ranges (written once to an Arrow
+    IPC file that pool workers memory-map), or a list of partition files.
+    Partitions run in a local process pool, or on socket workers started
+    with `python -m utils.partitioned_executor --serve` when `nodes` lists
+    their (host, port) addresses; `token` (default: DQ_WORKER_TOKEN) is sent
+    with every request, and file paths are resolved under each worker's
+    data root.
+
+    Unpartitioned rules (see plan_rules) are not run: they come back with an
+    error saying so, rather than the whole table being loaded into one
+    process. Run them with RuleExecutor where the table fits in memory.
+    """
+
+    def __init__(self, df=None, files=None, max_workers=None, tasks_per_worker=4, nodes=None,
+                 num_buckets=64, start_method="spawn", token=None):
+        if (df is None) == (files is None):
+            raise ValueError("Pass either a DataFrame or a list of partition files")
+        self.df = df
+        self.files = files
+        self.nodes = nodes
+        self.max_workers = max_workers or (len(nodes) if nodes else os.cpu_count() or 1)
+        self.tasks_per_worker = tasks_per_worker
+        self.num_buckets = num_buckets
+        self.start_method = start_method
+        self.token = token or os.environ.get("DQ_WORKER_TOKEN")
+
+    def run(self, rules):
+        """Violation results per rule, with how each rule was distributed"""
+        columns = self._columns()
+        specs = plan_rules(rules, columns)
+        partitioned = [spec for spec in specs if spec["kind"] != "unpartitioned"]
+        partials = self._run_partitions(partitioned) if partitioned else []
+
+        results = {"row_count": sum(partial["rows"] for partial in partials) if partials else self._row_count(),
+                   "partitions": len(partials), "rules": {}}
+        for spec in specs:
+            if spec["kind"] == "unpartitioned":
+                results["rules"][spec["rule_id"]] = {
+                    "category": spec["category"], "mode": "unpartitioned",
+                    "error": "Not row-local (it joins other tables, aggregates, or uses a subquery, LIMIT or "
+                             "ORDER BY), so it cannot be split across partitions; run it with RuleExecutor"
+                }
+            else:
+                results["rules"][spec["rule_id"]] = self._merge(spec, [partial["rules"][spec["rule_id"]]
+                                                                       for partial in partials])
+        return results
+
+    def _columns(self):
+        if self.df is not None:
+            return [str(column) for column in self.df.columns]
+        import pyarrow.dataset as ds
+
+        path = self.files[0]
+        if path.endswith(".parquet"):
+            return ds.dataset(path, format="parquet").schema.names
+        return [str(column) for column in _read_partition_file(path).columns]
+
+    def _row_count(self):
+        if self.df is not None:
+            return len(self.df)
+        import pyarrow.parquet as pq
+
+        # One file at a time; Parquet footers carry the count without reading rows
+        return sum(pq.ParquetFile(path).metadata.num_rows if path.endswith(".parquet")
+                   else len(_read_partition_file(path)) for path in self.files)
+
+    def _row_ranges(self):
+        row_count = len(self.df)
+        task_count = max(1, min(row_count, self.max_workers * self.tasks_per_worker))
+        bounds = [row_count * index // task_count for index in range(task_count + 1)]
+        return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+    def _run_partitions(self, specs):
+        if self.nodes:
+            return self._run_on_nodes(specs)
+        context = multiprocessing.get_context(self.start_method)
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as pool:
+            if self.files is not None:
+                futures = [pool.submit(_evaluate_file, path, specs, self.num_buckets) for path in self.files]
+                return [future.result() for future in futures]
+
+            import pyarrow as pa
+
+            with tempfile.TemporaryDirectory(prefix="dq_partitions_") as directory:
+                path = os.path.join(directory, "data.arrow")
+                table = pa.Table.from_pandas(self.df.rename(columns=str), preserve_index=False)
+                with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+                del table
+                futures = [pool.submit(_evaluate_range, path, start, stop, specs, self.num_buckets)
+                           for start, stop in self._row_ranges()]
+                return [future.result() for future in futures]
+
+    def _run_on_nodes(self, specs):
+        requests = ([({"path": path}, b"") for path in self.files] if self.files is not None
+                    else [({}, self._ipc_bytes(start, stop)) for start, stop in self._row_ranges()])
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            common = {"specs": specs, "num_buckets": self.num_buckets}
+            if self.token:
+                common["token"] = self.token
+            futures = [pool.submit(self._request, node, {**header, **common}, payload)
+                       for node, (header, payload) in zip(cycle(self.nodes), requests)]
+            return [future.result() for future in futures]
+
+    def _ipc_bytes(self, start, stop):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(self.df.iloc[start:stop].rename(columns=str), preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    @staticmethod
+    def _request(node, header, payload):
+        with socket.create_connection(tuple(node)) as sock:
+            _send_frame(sock, header, payload)
+            response, _ = _recv_frame(sock)
+        if "error" in response:
+            raise RuntimeError(f"Worker {node[0]}:{node[1]} failed: {response['error']}")
+        return response["partial"]
+
+    def _merge(self, spec, partials):
+        import numpy as np
+
+        result = {"category": spec["category"], "mode": spec["kind"]}
+        errors = [partial["error"] for partial in partials if "error" in partial]
+        if errors:
+            return {**result, "error": errors[0]}
+
+        if spec["kind"] == "row_filter":
+            result["violating_rows"] = sum(partial["violating_rows"] for partial in partials)
+            for bound, pick in (("min", min), ("max", max)):
+                result[bound] = {}
+                for column in spec["columns"]:
+                    values = [partial[bound][column] for partial in partials if partial[bound][column] is not None]
+                    try:
+                        result[bound][column] = pick(values) if values else None
+                    except TypeError:
+                        # SQLite columns can mix types; compare the way SQLite sorts text
+                        result[bound][column] = pick(values, key=str)
+            return result
+
+        # Equal keys always land in the same bucket, so each bucket is checked on its own.
+        # violating_rows counts duplicated keys, the rows the rule's GROUP BY query
+        # returns (as RuleExecutor.count_violations does); duplicate_rows counts the
+        # table rows that share them
+        duplicate_keys = 0
+        duplicate_rows = 0
+        for bucket in range(self.num_buckets):
+            encoded = [partial["buckets"][str(bucket)] for partial in partials if str(bucket) in partial["buckets"]]
+            if not encoded:
+                continue
+            hashes = np.concatenate([np.frombuffer(base64.b64decode(item), dtype=np.uint64) for item in encoded])
+            _, counts = np.unique(hashes, return_counts=True)
+            duplicated = counts[counts > 1]
+            duplicate_keys += len(duplicated)
+            duplicate_rows += int(duplicated.sum())
+        return {**result, "keys": sum(partial["keys"] for partial in partials),
+                "violating_rows": duplicate_keys, "duplicate_rows": duplicate_rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partition worker for PartitionedExecutor")
+    parser.add_argument("--serve", action="store_true", required=True)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9750)
+    parser.add_argument("--token", default=os.environ.get("DQ_WORKER_TOKEN"),
+                        help="Shared secret clients must send (default: DQ_WORKER_TOKEN); required off localhost")
+    parser.add_argument("--data-root", help="Directory partition files may be read from")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.token, args.data_root)
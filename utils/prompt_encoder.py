@@ -0,0 +1,239 @@
+import math
+import re
+
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Detail levels tried in order until the prompt fits the budget
+DETAIL_LEVELS = [
+    {"sample_rows": 5, "column_samples": 3, "histograms": True, "value_chars": 40, "all_fields": True, "dependencies": None},
+    {"sample_rows": 5, "column_samples": 3, "histograms": False, "value_chars": 40, "all_fields": True, "dependencies": None},
+    {"sample_rows": 2, "column_samples": 1, "histograms": False, "value_chars": 24, "all_fields": True, "dependencies": 10},
+    {"sample_rows": 0, "column_samples": 0, "histograms": False, "value_chars": 16, "all_fields": False, "dependencies": 5}
+]
+PROFILE_FIELDS = ["min", "max", "mean", "std", "p1", "p5", "p50", "p95", "p99", "shape"]
+CORE_PROFILE_FIELDS = ["min", "max", "p1", "p99"]
+
+class PromptBudgetError(ValueError):
+    """The prompt cannot fit the token budget; a configuration problem, not worth retrying"""
+
+
+_WORD_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|\s+|[^\sA-Za-z\d]")
+# Headroom on top of the local estimate for text it does not model (rare
+# words split into more pieces, multi-token non-ASCII characters)
+ESTIMATE_MARGIN = 1.2
+
+
+class TokenCounter:
+    """Counts tokens with the model's tiktoken encoding when it is installed.
+
+    tiktoken is a requirement, but its encoding files are downloaded on first
+    use; when they cannot be loaded a local estimate is used instead: one
+    token per 4 letters, per 3 digits, per symbol and per whitespace run
+    (newlines included), plus ESTIMATE_MARGIN on top, so it errs on the high
+    side and a budget enforced with it still holds for the real tokenizer.
+    """
+
+    def __init__(self, model="gpt-4o-mini"):
+        self.encoding = None
+        try:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # Not installed, or the encoding files cannot be fetched offline
+            self.encoding = None
+
+    @property
+    def name(self):
+        return self.encoding.name if self.encoding is not None else "estimate"
+
+    def count(self, text):
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        pieces = sum(math.ceil(len(piece) / 4) if piece[0].isalpha() else 1 for piece in _WORD_PIECES.findall(text))
+        return math.ceil(pieces * ESTIMATE_MARGIN)
+
+    def truncate(self, text, max_tokens):
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text)
+            return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+        while text and self.count(text) > max_tokens:
+            text = text[:int(len(text) * max_tokens / self.count(text)) - 1]
+        return text
+
+
+def format_value(value, digits=4, max_chars=40):
+    """One table cell: numbers rounded to `digits` significant digits, text shortened"""
+    if hasattr(value, "item") and not isinstance(value, (list, tuple, dict)):
+        value = value.item()  # numpy scalars
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:.{digits}g}"
+    if isinstance(value, (list, tuple)):
+        return ", ".join(format_value(item, digits, max_chars) for item in value)
+    text = " ".join(str(value).split()).replace("|", "/")
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+
+def format_table(headers, rows):
+    """Pipe-separated table; column names appear once in the header"""
+    return "\n".join("|".join(row) for row in [headers] + rows)
+
+
+class PromptEncoder:
+    """Compact, budgeted encoding of the data sent to the model.
+
+    Samples and column profiles become pipe-separated tables with rounded
+    numbers and shortened text instead of str() of nested dicts. If the
+    rendered prompt exceeds `token_budget`, detail is dropped level by level
+    (histograms, then sample rows and values, then profile fields). As a
+    last resort the data block itself is cut so the budget always holds.
+    Token counts before (the old str() encoding) and after are kept in
+    `stats`, one entry per call.
+    """
+
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, model="gpt-4o-mini", digits=4):
+        self.token_budget = token_budget
+        self.digits = digits
+        self.counter = TokenCounter(model)
+        self.stats = []
+
+    def fit(self, call, render, encode_payload, raw_payload):
+        """The prompt render(payload) at the highest detail level that fits the budget"""
+        tokens_before = self.counter.count(render(raw_payload))
+        truncated = False
+        for level in range(len(DETAIL_LEVELS)):
+            payload = encode_payload(level)
+            prompt = render(payload)
+            tokens = self.counter.count(prompt)
+            if tokens <= self.token_budget:
+                break
+        else:
+            fixed_tokens = self.counter.count(render(""))
+            if fixed_tokens >= self.token_budget:
+                raise PromptBudgetError(f"The {call} prompt needs {fixed_tokens} tokens before any data; "
+                                 f"raise the token budget above {self.token_budget}")
+            room = self.token_budget - fixed_tokens
+            while tokens > self.token_budget:
+                payload = self.counter.truncate(payload, room)
+                prompt = render(payload)
+                tokens = self.counter.count(prompt)
+                room -= max(1, tokens - self.token_budget)
+            truncated = True
+
+        self.stats.append({
+            "call": call,
+            "tokens_before": tokens_before,
+            "tokens_after": tokens,
+            "token_budget": self.token_budget,
+            "detail_level": level,
+            "truncated": truncated,
+            "tokenizer": self.counter.name
+        })
+        return prompt
+
+    def encode_analysis_payload(self, data_sample, column_info, level=0):
+        options = DETAIL_LEVELS[level]
+        sections = []
+        if options["sample_rows"] and data_sample:
+            sections.append("Sample rows:\n" + self.encode_sample(data_sample[:options["sample_rows"]], options))
+        sections.append("Column profiles (histogram: counts over equal-width bins from min to max):\n"
+                        + self.encode_profiles(column_info.get("types", {}), column_info.get("profiles", {}), options))
+        if column_info.get("missingness"):
+            sections.append("Missingness:\n" + self.encode_missingness(column_info["missingness"]))
+        return "\n\n".join(sections)
+
+    def encode_cross_column_payload(self, column_names, correlations, dependencies=None, level=0):
+        options = DETAIL_LEVELS[level]
+        sections = ["Columns: " + ", ".join(str(column) for column in column_names)]
+        if correlations:
+            sections.append("Correlations:\n" + format_table(
+                ["column_a", "column_b", "r"],
+                [[str(pair["columns"][0]), str(pair["columns"][1]), format_value(pair["correlation"], 2)]
+                 for pair in correlations]
+            ))
+        else:
+            sections.append("Correlations: none strong")
+        if dependencies:
+            limit = options["dependencies"]
+            sections.append("Relationships discovered in the data (strongest first):\n"
+                            + "\n".join(f"- {dependency}" for dependency in dependencies[:limit]))
+        return "\n\n".join(sections)
+
+    def encode_sample(self, records, options):
+        headers = []
+        for record in records:
+            headers.extend(key for key in record if key not in headers)
+        rows = [[format_value(record.get(key), self.digits, options["value_chars"]) for key in headers]
+                for record in records]
+        return format_table([str(header) for header in headers], rows)
+
+    def encode_profiles(self, types, profiles, options):
+        fields = PROFILE_FIELDS if options["all_fields"] else CORE_PROFILE_FIELDS
+        flattened = {column: self._flatten_profile(profile) for column, profile in profiles.items()}
+        # Only fields some column actually has become table columns
+        present = [field for field in fields if any(field in profile for profile in flattened.values())]
+        headers = ["column", "type", "unique", "missing"] + present
+        if options["column_samples"]:
+            headers.append("samples")
+        if options["histograms"] and any("histogram" in profile for profile in flattened.values()):
+            headers.append("histogram")
+
+        rows = []
+        for column in dict.fromkeys(list(types) + list(profiles)):
+            profile = flattened.get(column, {})
+            row = [str(column), str(types.get(column, "")), profile.get("unique", ""),
+                   format_value(profile.get("missing"), self.digits)]
+            row += [format_value(profile.get(field), self.digits, options["value_chars"]) for field in present]
+            if options["column_samples"]:
+                row.append(format_value(profile.get("samples", [])[:options["column_samples"]], self.digits,
+                                        options["value_chars"]))
+            if "histogram" in headers:
+                row.append("/".join(format_value(count) for count in profile.get("histogram", [])))
+            rows.append(row)
+        return format_table(headers, rows)
+
+    def _flatten_profile(self, profile):
+        flat = {
+            "missing": profile.get("missing_count"),
+            "samples": profile.get("sample_values", [])
+        }
+        unique = format_value(profile.get("unique_count"), self.digits)
+        # HyperLogLog estimates are marked approximate
+        flat["unique"] = f"~{unique}" if "unique_count_relative_error" in profile else unique
+        for field in ("min", "max", "mean", "std"):
+            if field in profile:
+                flat[field] = profile[field]
+        flat.update(profile.get("percentiles", {}))
+        if "distribution" in profile:
+            flat["shape"] = profile["distribution"].get("shape")
+        if "histogram" in profile:
+            flat["histogram"] = profile["histogram"].get("counts", [])
+        return flat
+
+    def encode_missingness(self, summary):
+        lines = [f"rows with any null: {summary.get('rows_with_any_null', 0)}"]
+        implications = summary.get("null_implications") or []
+        if implications:
+            lines.append("if null then null: " + "; ".join(
+                f"{item['if_null']}->{item['then_null']} ({format_value(item['confidence'], 2)})"
+                for item in implications
+            ))
+        patterns = summary.get("frequent_null_patterns") or []
+        if patterns:
+            lines.append("null together: " + "; ".join(
+                f"{'+'.join(map(str, item['null_columns']))} ({format_value(item['share'] * 100, 3)}%)"
+                for item in patterns
+            ))
+        return "\n".join(lines)
@@ -0,0 +1,208 @@
+import re
+import sqlite3
+from array import array
+
+from utils.rule_model import RuleSet
+
+# Table name the generated pseudo SQL uses as a placeholder
+TABLE_PLACEHOLDER = "table_name"
+
+# Plain row filters ("SELECT * FROM <table> [WHERE ...]") can select rowids directly
+_ROW_FILTER = re.compile(r"^\s*SELECT\s+\*\s+FROM\s+(\w+)(\s+WHERE\s.*?)?\s*;?\s*$", re.IGNORECASE | re.DOTALL)
+_NOT_A_ROW_FILTER = re.compile(r"\b(JOIN|GROUP\s+BY|UNION|INTERSECT|EXCEPT)\b", re.IGNORECASE)
+# Clauses that look at more than the row at hand: subqueries, LIMIT/OFFSET, ORDER BY
+_NOT_ROW_LOCAL = re.compile(r"\b(SELECT|LIMIT|OFFSET|ORDER\s+BY)\b", re.IGNORECASE)
+# Duplicate checks: "SELECT ... FROM <table> [WHERE ...] GROUP BY <keys> HAVING COUNT(*) > 1"
+_UNIQUE_CHECK = re.compile(
+    r"^\s*SELECT\s.+?\sFROM\s+(\w+)(\s+WHERE\s.+?)?\s+GROUP\s+BY\s+(.+?)\s+HAVING\s+COUNT\s*\(\s*\*\s*\)\s*>\s*1\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+# Tables a query reads: names after FROM or JOIN (subqueries start with "(" instead)
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+[\"`\[]?(\w+)", re.IGNORECASE)
+
+
+def _regexp(pattern, value):
+    """SQLite has no built-in REGEXP; `x REGEXP p` calls regexp(p, x)."""
+    if pattern is None or value is None:
+        return None
+    try:
+        return 1 if re.search(pattern, str(value)) else 0
+    except re.error:
+        return None
+
+
+def is_row_filter(sql, table=TABLE_PLACEHOLDER):
+    """Whether the SQL just filters rows of `table`, so each result row is one table row"""
+    match = _ROW_FILTER.match(sql)
+    return bool(match) and match.group(1) == table and not _NOT_A_ROW_FILTER.search(match.group(2) or "")
+
+
+def is_row_local(clause):
+    """Whether a WHERE clause reads only the row itself.
+
+    Such a clause gives the same answer for a row whichever partition holds
+    it, so per-partition counts add up; a subquery (e.g. v > (SELECT AVG(v)
+    ...)) or LIMIT/ORDER BY would be evaluated per partition instead.
+    """
+    return not _NOT_ROW_LOCAL.search(clause or "")
+
+
+def is_row_local_filter(sql, table=TABLE_PLACEHOLDER):
+    """A row filter (see is_row_filter) whose WHERE clause is row-local"""
+    return is_row_filter(sql, table) and is_row_local(_ROW_FILTER.match(sql).group(2))
+
+
+def parse_unique_check(sql, table=TABLE_PLACEHOLDER):
+    """(key columns, WHERE clause) of a GROUP BY duplicate check on `table`, else None"""
+    match = _UNIQUE_CHECK.match(sql)
+    if not match or match.group(1) != table or _NOT_A_ROW_FILTER.search(match.group(2) or ""):
+        return None
+    keys = [key.strip().strip('"`[]') for key in match.group(3).split(",")]
+    if not all(re.fullmatch(r"\w+", key) for key in keys):
+        return None
+    return keys, match.group(2) or ""
+
+
+def referenced_tables(sql):
+    """Names of the tables a query reads, in order of first appearance"""
+    return list(dict.fromkeys(_TABLE_REFERENCE.findall(sql)))
+
+
+def iter_executable_rules(rules):
+    """Yield (rule_id, category, rule) for every rule that carries pseudo SQL."""
+    for rule in RuleSet.coerce(rules):
+        if rule.has_sql:
+            yield rule.rule_id, rule.category.value, rule
+
+
+class RuleExecutor:
+    """Run the pseudo SQL of generated rules against data loaded into SQLite.
+
+    The connection is query-only outside register_table, so a rule such as
+    DELETE FROM table_name fails with sqlite3.OperationalError instead of
+    silently emptying the table for every rule after it.
+    """
+
+    def __init__(self, df=None, database=":memory:", chunk_size=50000):
+        self.chunk_size = chunk_size
+        self.connection = sqlite3.connect(database, check_same_thread=False)
+        self.connection.create_function("REGEXP", 2, _regexp, deterministic=True)
+        self.connection.execute("PRAGMA query_only = ON")
+        self.tables = {}
+        if df is not None:
+            self.register_table(TABLE_PLACEHOLDER, df)
+
+    def register_table(self, name, df):
+        """Load a DataFrame into SQLite in chunks so rules can query it by name"""
+        self.connection.execute("PRAGMA query_only = OFF")
+        try:
+            df.to_sql(name, self.connection, if_exists="replace", index=False, chunksize=self.chunk_size)
+        finally:
+            self.connection.execute("PRAGMA query_only = ON")
+        self.tables[name] = [str(column) for column in df.columns]
+
+    def iter_violations(self, rule, chunk_size=None, max_rows=None):
+        """Yield (columns, rows) chunks returned by a rule's pseudo SQL.
+
+        Rows are pulled from the cursor with fetchmany, so at most one chunk is
+        held in memory no matter how many rows violate the rule.
+        """
+        chunk_size = chunk_size or self.chunk_size
+        cursor = self.connection.execute(rule.pseudo_sql)
+        try:
+            columns = [description[0] for description in cursor.description or []]
+            remaining = max_rows
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                if remaining is not None:
+                    remaining -= len(rows)
+                yield columns, rows
+        finally:
+            cursor.close()
+
+    def count_violations(self, rule):
+        """Number of rows a rule's pseudo SQL returns, counted inside SQLite"""
+        sql = rule.pseudo_sql.strip().rstrip(";")
+        return self.connection.execute(f"SELECT COUNT(*) FROM ({sql})").fetchone()[0]
+
+    def count_violating_rows(self, rule, table=TABLE_PLACEHOLDER):
+        """Number of rows of `table` a rule flags, counted inside SQLite where possible.
+
+        Same as len(violating_row_ids(...)): for a duplicate check this is the
+        rows in duplicated key groups, not the number of groups that
+        count_violations returns.
+        """
+        sql = rule.pseudo_sql.strip().rstrip(";")
+        if is_row_filter(sql, table):
+            return self.count_violations(rule)
+        unique_check = parse_unique_check(sql, table)
+        if unique_check is not None:
+            keys, where = unique_check
+            group_by = ", ".join(f'"{key}"' for key in keys)
+            query = (f'SELECT COALESCE(SUM(group_rows), 0) FROM (SELECT COUNT(*) AS group_rows FROM "{table}"{where} '
+                     f'GROUP BY {group_by} HAVING COUNT(*) > 1)')
+            return self.connection.execute(query).fetchone()[0]
+        return len(self.violating_row_ids(rule, table))
+
+    def row_count(self, table=TABLE_PLACEHOLDER):
+        return self.connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+    def violating_row_ids(self, rule, table=TABLE_PLACEHOLDER):
+        """0-based positions of the rows of `table` a rule flags, as an array('q').
+
+        Rows are loaded in DataFrame order, so rowid - 1 is the position. Plain
+        row filters select rowids directly and GROUP BY duplicate checks count
+        each row's key group with a window function. Anything else is matched
+        back to the table on the result columns the two share: the result runs
+        once into an IN list, compared by quote() so NULLs match like IS.
+        Rules that read another table do not flag rows of `table`; they raise
+        ValueError rather than being matched on column names that happen to
+        coincide.
+        """
+        sql = rule.pseudo_sql.strip().rstrip(";")
+        if is_row_filter(sql, table):
+            query = f'SELECT rowid - 1 FROM "{table}"{_ROW_FILTER.match(sql).group(2) or ""}'
+            return self._fetch_ids(query)
+
+        other_tables = [name for name in referenced_tables(sql) if name != table]
+        if other_tables:
+            raise ValueError(f"Rule {rule.rule_id} reads {', '.join(other_tables)}, not just {table}")
+
+        unique_check = parse_unique_check(sql, table)
+        if unique_check is not None:
+            keys, where = unique_check
+            partition = ", ".join(f'"{key}"' for key in keys)
+            query = (f'SELECT position FROM (SELECT rowid - 1 AS position, COUNT(*) OVER (PARTITION BY {partition}) '
+                     f'AS group_rows FROM "{table}"{where}) WHERE group_rows > 1')
+            return self._fetch_ids(query)
+
+        # The rule's result columns, without running it
+        cursor = self.connection.execute(f"SELECT * FROM ({sql}) LIMIT 0")
+        result_columns = [description[0] for description in cursor.description]
+        cursor.close()
+        shared = [column for column in result_columns if column in self.tables.get(table, [])]
+        if not shared:
+            raise ValueError(f"Result columns of rule {rule.rule_id} do not identify rows of {table}")
+        row_key = ", ".join(f'quote(t."{column}")' for column in shared)
+        result_key = ", ".join(f'quote(v."{column}")' for column in shared)
+        query = f'SELECT t.rowid - 1 FROM "{table}" t WHERE ({row_key}) IN (SELECT {result_key} FROM ({sql}) v)'
+        return self._fetch_ids(query)
+
+    def _fetch_ids(self, query):
+        ids = array("q")
+        cursor = self.connection.execute(query)
+        try:
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                ids.extend(row[0] for row in rows)
+        finally:
+            cursor.close()
+        return ids
+
+    def close(self):
+        self.connection.close()
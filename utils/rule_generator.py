@@ -1,60 +1,189 @@
 import json
 from datetime import datetime
 
+from utils.prompt_encoder import PromptBudgetError
+from utils.rule_model import RuleSet
+
+RULE_CATEGORIES = ["accuracy", "completeness", "uniqueness", "consistency", "timeliness", "validity"]
+
 class RuleGenerator:
-    def __init__(self, data_analyzer, openai_helper):
+    def __init__(self, data_analyzer, openai_helper, max_dependency_candidates=15, max_retries=2, schema_index=None):
         self.data_analyzer = data_analyzer
         self.openai_helper = openai_helper
+        self.max_dependency_candidates = max_dependency_candidates
+        self.max_retries = max_retries
+        # Optional SchemaIndex of earlier rule sets to reuse for similar datasets
+        self.schema_index = schema_index
+        self.generation_stats = {}
+
+    def generate_rules(self, user_context="", dataset_name=None):
+        self.generation_stats = {
+            "api_calls": 0,
+            "retries": 0,
+            "failed_categories": {},
+            "recovered_categories": [],
+            "unrecovered_categories": [],
+            "prompt_tokens": [],
+            "schema_reuse": None
+        }
+        encoder_stats_start = len(self.openai_helper.encoder.stats)
+
+        match = None
+        if self.schema_index is not None:
+            from utils.schema_index import SchemaSignature
+
+            signature = SchemaSignature.from_dataframe(self.data_analyzer.df, self.data_analyzer.infer_column_types())
+            match = self.schema_index.lookup(signature)
+
+        if match is None:
+            all_rules = self._request_rules(self.data_analyzer, user_context)
+        else:
+            # Stored rules remapped to this dataset's columns; the model is only
+            # asked about the columns the stored dataset did not have
+            self.generation_stats["schema_reuse"] = match.to_dict()
+            all_rules = match.rules
+            if match.new_columns:
+                new_columns_analyzer = type(self.data_analyzer)(
+                    self.data_analyzer.df[match.new_columns], **self.data_analyzer.profile_options()
+                )
+                for category, rule_list in self._request_rules(new_columns_analyzer, user_context).items():
+                    all_rules.setdefault(category, []).extend(rule_list)
+
+        # Token counts before/after compaction for every prompt sent in this run
+        self.generation_stats["prompt_tokens"] = self.openai_helper.encoder.stats[encoder_stats_start:]
+
+        # Validate that SQL code is present in rules and add fallback if missing
+        self._validate_and_fix_sql_presence(all_rules)
+
+        # Only rule sets the model contributed to are stored, so reuse alone
+        # does not fill the index with copies
+        if self.schema_index is not None and (match is None or match.new_columns):
+            self.schema_index.add(signature, all_rules, name=dataset_name)
+
+        # Normalize once; every consumer works from the RuleSet from here on
+        return RuleSet.from_dict(all_rules)
+
+    def _request_rules(self, data_analyzer, user_context):
+        """Category and cross-column rules for the analyzer's columns, in the interchange shape"""
+        # Imported here so importing the generator stays as light as the data
+        # analyzer it is handed
+        from utils.dependency_discovery import DependencyDiscovery
 
-    def generate_rules(self, user_context=""):
         # Get data insights
-        column_types = self.data_analyzer.infer_column_types()
-        column_profiles = self.data_analyzer.generate_column_profiles()
-        correlations = self.data_analyzer.get_column_correlations()
+        column_types = data_analyzer.infer_column_types()
+        column_profiles = data_analyzer.generate_column_profiles()
+        # Only strong correlations and the top discovered dependencies go into the
+        # cross-column prompt, instead of the full correlation matrix
+        correlations = data_analyzer.get_strong_correlations()
+        dependencies = DependencyDiscovery(data_analyzer.df).top_candidates(self.max_dependency_candidates)
 
         # Get AI-generated rules
-        sample_data = self.data_analyzer.get_data_sample()
+        sample_data = data_analyzer.get_data_sample()
         column_info = {
             "types": column_types,
-            "profiles": column_profiles
+            "profiles": column_profiles,
+            "missingness": data_analyzer.get_missingness_summary()
         }
 
-        rules = self.openai_helper.analyze_data_sample(
-            sample_data, 
-            column_info,
-            user_context
-        )
-
-        # Get cross-column rules
-        cross_column_rules = self.openai_helper.suggest_cross_column_rules(
-            list(column_types.keys()),
-            correlations,
-            user_context
-        )
-
-        # Combine all rules with error handling and SQL validation
-        try:
-            all_rules = rules.get("rules", {})
-            cross_column_rules_list = cross_column_rules.get("cross_column_rules", [])
-            all_rules["cross_column"] = cross_column_rules_list
-            
-            # Validate that SQL code is present in rules and add fallback if missing
-            self._validate_and_fix_sql_presence(all_rules)
-            
-        except Exception as e:
-            # Fallback if there's an issue with rule structure
-            all_rules = {
-                "accuracy": ["Error generating rules - please try again"],
-                "completeness": [],
-                "uniqueness": [],
-                "consistency": [],
-                "timeliness": [],
-                "validity": [],
-                "cross_column": []
-            }
+        def request_category_rules(categories):
+            return self.openai_helper.analyze_data_sample(
+                sample_data,
+                column_info,
+                user_context,
+                categories=None if categories == RULE_CATEGORIES else categories
+            ).get("rules", {})
+
+        def request_cross_column_rules(categories):
+            return {"cross_column": self.openai_helper.suggest_cross_column_rules(
+                list(column_types.keys()),
+                correlations,
+                user_context,
+                dependencies
+            ).get("cross_column_rules", [])}
 
+        # Each completion is validated per category; only the categories that
+        # failed (or came back empty) are re-requested, with bounded retries
+        all_rules = {}
+        for request, categories in ((request_category_rules, RULE_CATEGORIES),
+                                    (request_cross_column_rules, ["cross_column"])):
+            all_rules.update(self._request_with_retries(request, categories))
         return all_rules
 
+    def _request_with_retries(self, request, categories):
+        """Call `request` for the pending categories until each passes validation or retries run out"""
+        accepted = {}
+        pending = list(categories)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.generation_stats["retries"] += 1
+            self.generation_stats["api_calls"] += 1
+            try:
+                payload = request(pending)
+                if not isinstance(payload, dict):
+                    raise ValueError(f"expected an object of categories, got {type(payload).__name__}")
+                errors = {}
+                for category in pending:
+                    rules, error = self._validate_category(category, payload.get(category))
+                    if error:
+                        errors[category] = error
+                    else:
+                        accepted[category] = rules
+            except PromptBudgetError:
+                raise
+            except (ValueError, TypeError, AttributeError, KeyError) as e:
+                # An unparseable completion fails every category it carried
+                errors = {category: f"unparseable response: {e}" for category in pending}
+            except Exception as e:
+                # Auth, bad-request and similar errors would fail every retry the same way
+                if not _is_transient_api_error(e):
+                    raise
+                errors = {category: f"request failed: {e}" for category in pending}
+
+            for category, error in errors.items():
+                self.generation_stats["failed_categories"].setdefault(category, []).append(error)
+            if attempt and pending:
+                self.generation_stats["recovered_categories"].extend(c for c in pending if c not in errors)
+            pending = list(errors)
+            if not pending:
+                break
+
+        for category in pending:
+            # Categories that only ever came back empty are accepted as empty
+            accepted[category] = []
+            if any(not error.startswith("empty") for error in self.generation_stats["failed_categories"][category]):
+                self.generation_stats["unrecovered_categories"].append(category)
+        return {category: accepted[category] for category in categories}
+
+    @staticmethod
+    def _validate_category(category, payload):
+        """Check one category's payload against the rule schema; returns (valid_rules, error)"""
+        if payload is None:
+            return None, "missing from response"
+        if not isinstance(payload, list):
+            return None, f"expected a list of rules, got {type(payload).__name__}"
+        if not payload:
+            return None, "empty"
+
+        columns_key, type_key = ("columns_involved", "validation_type") if category == "cross_column" else ("columns", "type")
+        valid_rules = []
+        for rule in payload:
+            if not isinstance(rule, dict) or not isinstance(rule.get("rule"), str) or not rule["rule"].strip():
+                continue
+            columns = rule.get(columns_key, rule.get("columns", rule.get("columns_involved")))
+            if isinstance(columns, str):
+                columns = [columns]
+            if not isinstance(columns, list) or not columns or not all(isinstance(c, str) for c in columns):
+                continue
+            if not isinstance(rule.get(type_key, rule.get("type", rule.get("validation_type", ""))), str):
+                continue
+            if "pseudo_sql" in rule and rule["pseudo_sql"] is not None and not isinstance(rule["pseudo_sql"], str):
+                continue
+            valid_rules.append(rule)
+
+        if not valid_rules:
+            return None, f"none of the {len(payload)} rules matched the schema"
+        return valid_rules, None
+
     def _validate_and_fix_sql_presence(self, rules):
         """Validate that SQL code is present in the generated rules and add fallback SQL if missing."""
         missing_sql_count = 0
@@ -147,32 +276,21 @@ class RuleGenerator:
                 return f"SELECT * FROM table_name WHERE {conditions}"
 
     def format_rules_for_display(self, rules):
-        formatted_rules = {}
-        categories = {
-            "accuracy": "Accuracy Rules",
-            "completeness": "Completeness Rules",
-            "uniqueness": "Uniqueness Rules",
-            "consistency": "Consistency Rules",
-            "timeliness": "Timeliness Rules",
-            "validity": "Validity Rules",
-            "cross_column": "Cross-Column Rules"
-        }
-
-        for category, rules_list in rules.items():
-            if category in categories:
-                # Ensure rules_list is a list and handle None/empty cases
-                if rules_list is None:
-                    rules_list = []
-                elif not isinstance(rules_list, list):
-                    rules_list = [rules_list] if rules_list else []
-                
-                formatted_rules[categories[category]] = rules_list
-
-        return formatted_rules
+        rule_set = RuleSet.coerce(rules)
+        return {category.display_name: rule_list for category, rule_list in rule_set.items()}
 
     def export_rules_to_json(self, rules):
         export_data = {
             "generated_at": datetime.now().isoformat(),
-            "rules": rules
+            "rules": RuleSet.coerce(rules).to_dict()
         }
-        return json.dumps(export_data, indent=2)
\ No newline at end of file
+        return json.dumps(export_data, indent=2)
+
+
+def _is_transient_api_error(error):
+    """Connection problems, timeouts, rate limits and server errors, which a retry can get past"""
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
@@ -0,0 +1,205 @@
+import sys
+from enum import Enum
+
+NO_SQL_PLACEHOLDER = 'No SQL code available'
+
+
+class RuleCategory(str, Enum):
+    ACCURACY = "accuracy"
+    COMPLETENESS = "completeness"
+    UNIQUENESS = "uniqueness"
+    CONSISTENCY = "consistency"
+    TIMELINESS = "timeliness"
+    VALIDITY = "validity"
+    CROSS_COLUMN = "cross_column"
+    REFERENTIAL_INTEGRITY = "referential_integrity"
+
+    @property
+    def display_name(self):
+        return _DISPLAY_NAMES[self]
+
+    @property
+    def is_dimension(self):
+        """The six data quality dimensions, as opposed to multi-column/table categories"""
+        return self not in (RuleCategory.CROSS_COLUMN, RuleCategory.REFERENTIAL_INTEGRITY)
+
+    @property
+    def is_cross_column(self):
+        return not self.is_dimension
+
+    @classmethod
+    def parse(cls, value):
+        """The category for a raw key, or None for keys the app doesn't know"""
+        try:
+            return cls(value)
+        except ValueError:
+            return None
+
+
+_DISPLAY_NAMES = {
+    RuleCategory.ACCURACY: "Accuracy Rules",
+    RuleCategory.COMPLETENESS: "Completeness Rules",
+    RuleCategory.UNIQUENESS: "Uniqueness Rules",
+    RuleCategory.CONSISTENCY: "Consistency Rules",
+    RuleCategory.TIMELINESS: "Timeliness Rules",
+    RuleCategory.VALIDITY: "Validity Rules",
+    RuleCategory.CROSS_COLUMN: "Cross-Column Rules",
+    RuleCategory.REFERENTIAL_INTEGRITY: "Referential Integrity Rules"
+}
+
+
+class Rule:
+    """One normalized rule.
+
+    Raw rules arrive as dicts using either columns/type or (for cross-column
+    rules) columns_involved/validation_type, or as plain strings. They are
+    normalized once here; column names are interned so the thousands of
+    references to the same few columns share one string.
+    """
+
+    __slots__ = ("rule_id", "category", "text", "columns", "rule_type", "pseudo_sql", "extra", "is_detailed")
+
+    def __init__(self, rule_id, category, text, columns=(), rule_type="unknown", pseudo_sql=None,
+                 extra=None, is_detailed=True):
+        self.rule_id = rule_id
+        self.category = category
+        self.text = text
+        self.columns = tuple(sys.intern(str(column)) for column in columns)
+        self.rule_type = sys.intern(rule_type or "unknown")
+        self.pseudo_sql = pseudo_sql
+        self.extra = extra
+        self.is_detailed = is_detailed
+
+    @classmethod
+    def from_raw(cls, rule_id, category, raw):
+        if not isinstance(raw, dict):
+            return cls(rule_id, category, str(raw), is_detailed=False)
+        columns = raw.get('columns', raw.get('columns_involved', []))
+        if isinstance(columns, str):
+            columns = [columns]
+        elif not isinstance(columns, (list, tuple)):
+            columns = []
+        rule_type = raw.get('type', raw.get('validation_type', 'unknown'))
+        extra = {key: value for key, value in raw.items()
+                 if key not in ('rule', 'columns', 'columns_involved', 'type', 'validation_type', 'pseudo_sql')}
+        return cls(
+            rule_id,
+            category,
+            str(raw.get('rule', 'No rule description available')),
+            columns,
+            str(rule_type),
+            raw.get('pseudo_sql') or None,
+            extra or None
+        )
+
+    def edited(self, text=None, pseudo_sql=None):
+        """A copy of this rule with a new description and/or SQL"""
+        return Rule(
+            self.rule_id,
+            self.category,
+            self.text if text is None else text,
+            self.columns,
+            self.rule_type,
+            self.pseudo_sql if pseudo_sql is None else (pseudo_sql or None),
+            self.extra,
+            self.is_detailed
+        )
+
+    @property
+    def has_sql(self):
+        return bool(self.pseudo_sql) and self.pseudo_sql != NO_SQL_PLACEHOLDER
+
+    def to_dict(self):
+        """Back to the interchange shape the model produced (strings stay strings)"""
+        if not self.is_detailed:
+            return self.text
+        columns_key, type_key = (("columns_involved", "validation_type")
+                                 if self.category == RuleCategory.CROSS_COLUMN else ("columns", "type"))
+        raw = {"rule": self.text, columns_key: list(self.columns), type_key: self.rule_type}
+        if self.pseudo_sql:
+            raw["pseudo_sql"] = self.pseudo_sql
+        if self.extra:
+            raw.update(self.extra)
+        return raw
+
+    def __repr__(self):
+        return f"Rule({self.rule_id!r}, {self.category.value!r}, {self.text!r})"
+
+
+class RuleSet:
+    """All rules of a run, normalized once and shared by every consumer.
+
+    Rules keep their category order and get stable ids of the form
+    "<category>_<n>" (1-based position within the category).
+    """
+
+    def __init__(self):
+        self._by_category = {}
+        self._by_id = {}
+
+    @classmethod
+    def from_dict(cls, rules):
+        rule_set = cls()
+        for category, rule_list in rules.items():
+            rule_set.add_category(category, rule_list)
+        return rule_set
+
+    @classmethod
+    def coerce(cls, rules):
+        return rules if isinstance(rules, RuleSet) else cls.from_dict(rules)
+
+    def add_category(self, category, rule_list):
+        """Add (or replace) a category from raw rules; unknown categories are ignored"""
+        category = RuleCategory.parse(category)
+        if category is None:
+            return
+        for rule in self._by_category.pop(category, []):
+            del self._by_id[rule.rule_id]
+        if rule_list is None:
+            rule_list = []
+        elif not isinstance(rule_list, list):
+            rule_list = [rule_list]
+        rules = [Rule.from_raw(f"{category.value}_{index + 1}", category, raw)
+                 for index, raw in enumerate(rule_list)]
+        self._by_category[category] = rules
+        self._by_id.update((rule.rule_id, rule) for rule in rules)
+
+    def replace(self, rule):
+        """Swap in an edited rule, keeping its id and position"""
+        rules = self._by_category[rule.category]
+        rules[rules.index(self._by_id[rule.rule_id])] = rule
+        self._by_id[rule.rule_id] = rule
+
+    def without(self, rule_ids):
+        """A RuleSet sharing these rules minus the given ids (ids are kept, not renumbered)"""
+        rule_set = RuleSet()
+        for category, rules in self._by_category.items():
+            kept = [rule for rule in rules if rule.rule_id not in rule_ids]
+            rule_set._by_category[category] = kept
+            rule_set._by_id.update((rule.rule_id, rule) for rule in kept)
+        return rule_set
+
+    def categories(self):
+        return list(self._by_category)
+
+    def by_category(self, category):
+        return self._by_category.get(RuleCategory(category), [])
+
+    def items(self):
+        return self._by_category.items()
+
+    def get(self, rule_id):
+        return self._by_id.get(rule_id)
+
+    def __iter__(self):
+        for rules in self._by_category.values():
+            yield from rules
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, rule_id):
+        return rule_id in self._by_id
+
+    def to_dict(self):
+        return {category.value: [rule.to_dict() for rule in rules] for category, rules in self._by_category.items()}
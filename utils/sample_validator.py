@@ -0,0 +1,140 @@
+import math
+import sqlite3
+
+from utils.rule_executor import TABLE_PLACEHOLDER, RuleExecutor, is_row_filter, iter_executable_rules
+
+
+def wilson_interval(failures, trials, z=1.96):
+    """Wilson score interval for a binomial proportion; stays sensible near 0 and 1"""
+    if trials == 0:
+        return 0.0, 1.0
+    rate = failures / trials
+    denominator = 1 + z * z / trials
+    center = (rate + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class SampleValidator:
+    """Estimate every rule's violation rate on random samples before any full scan.
+
+    Rules run on nested random samples of growing size. After each stage a
+    rule's violation rate gets a Wilson confidence interval. A rule is settled
+    as soon as its interval lies entirely above `broken_rate` (the threshold is
+    most likely wrong, so flag it for review) or entirely below it. Only
+    unsettled rules move on to the next, larger sample. Full-table counts are
+    computed later, and only for the rules the user confirms.
+
+    For row filters the sample rate estimates the table rate. For aggregate
+    rules (e.g. GROUP BY duplicate checks) it is only a lower bound, because
+    duplicates are rarer in a sample than in the full table: a sample can
+    settle them as broken, but never as ok unless it is the whole table.
+    """
+
+    def __init__(self, df, tables=None, sample_sizes=(1000, 10000, 100000), broken_rate=0.2, z=1.96, seed=0):
+        self.df = df
+        self.tables = tables or {}
+        self.sample_sizes = sorted({min(size, len(df)) for size in sample_sizes})
+        self.broken_rate = broken_rate
+        self.z = z
+        # One shuffle; each stage takes a longer prefix of it, so samples are nested
+        self._sample = df.sample(n=self.sample_sizes[-1], random_state=seed).reset_index(drop=True) if len(df) else df
+
+    def iter_estimates(self, rules):
+        """Yield one estimate per rule per stage, as soon as that stage has run it.
+
+        Estimates carry final=True once the rule is settled or the last stage is
+        done, so callers can show partial results while larger samples run.
+        """
+        pending = {rule_id: (category, rule) for rule_id, category, rule in iter_executable_rules(rules)}
+        for stage, sample_size in enumerate(self.sample_sizes):
+            if not pending:
+                break
+            last_stage = stage == len(self.sample_sizes) - 1
+            executor = self._executor(self._sample.iloc[:sample_size])
+            try:
+                for rule_id, (category, rule) in list(pending.items()):
+                    estimate = self._estimate(executor, rule_id, category, rule, sample_size, last_stage)
+                    if estimate["final"]:
+                        del pending[rule_id]
+                    yield estimate
+            finally:
+                executor.close()
+
+    def validate_sample(self, rules):
+        """Final estimate for every rule, keyed by rule id"""
+        estimates = {}
+        for estimate in self.iter_estimates(rules):
+            estimates[estimate["rule_id"]] = estimate
+        return estimates
+
+    def validate_full(self, rules, rule_ids):
+        """Exact violation counts on the full table, for the confirmed rules only"""
+        rule_ids = set(rule_ids)
+        results = {}
+        executor = self._executor(self.df)
+        try:
+            for rule_id, category, rule in iter_executable_rules(rules):
+                if rule_id not in rule_ids:
+                    continue
+                try:
+                    violating_rows = executor.count_violating_rows(rule)
+                except (sqlite3.Error, ValueError) as e:
+                    results[rule_id] = {"category": category, "error": str(e)}
+                    continue
+                results[rule_id] = {
+                    "category": category,
+                    "violating_rows": violating_rows,
+                    "violation_rate": violating_rows / len(self.df) if len(self.df) else 0.0
+                }
+        finally:
+            executor.close()
+        return results
+
+    def _executor(self, df):
+        """Executor over `df` (a sample or the full table) and the related tables.
+
+        The primary table is usually in `tables` too, under its own name, for
+        cross-table rules; it gets `df` there as well, so those rules run on
+        the sample instead of scanning the full table at every stage.
+        """
+        executor = RuleExecutor(df)
+        for table_name, table_df in self.tables.items():
+            if table_name != TABLE_PLACEHOLDER:
+                executor.register_table(table_name, df if table_df is self.df else table_df)
+        return executor
+
+    def _estimate(self, executor, rule_id, category, rule, sample_size, last_stage):
+        estimate = {
+            "rule_id": rule_id,
+            "category": category,
+            "rule": rule.text,
+            "kind": "row_filter" if is_row_filter(rule.pseudo_sql.strip().rstrip(";")) else "aggregate",
+            "sample_rows": sample_size,
+            "exact": sample_size == len(self.df)
+        }
+        try:
+            violating_rows = executor.count_violating_rows(rule)
+        except (sqlite3.Error, ValueError) as e:
+            return {**estimate, "status": "error", "error": str(e), "final": True}
+
+        violation_rate = violating_rows / sample_size if sample_size else 0.0
+        if estimate["exact"]:
+            ci_low = ci_high = violation_rate
+        else:
+            ci_low, ci_high = wilson_interval(violating_rows, sample_size, self.z)
+        if ci_low >= self.broken_rate:
+            status = "broken"
+        elif ci_high < self.broken_rate and (estimate["kind"] == "row_filter" or estimate["exact"]):
+            status = "ok"
+        else:
+            status = "review"
+        return {
+            **estimate,
+            "violating_rows": violating_rows,
+            "violation_rate": violation_rate,
+            "ci_low": ci_low,
+            "ci_high": ci_high,
+            "status": status,
+            "final": status != "review" or last_stage or estimate["exact"]
+        }
@@ -0,0 +1,331 @@
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from utils.sketches import MinHash, _mix64, hash_series
+
+DEFAULT_INDEX_DIR = "dq_schema_index"
+
+# Dataset signature: NUM_PERM MinHash values, split into BANDS LSH bands
+NUM_PERM = 128
+BANDS = 32
+# Per-column value signature, and how many of its slots feed the dataset signature
+VALUE_PERM = 32
+VALUE_TOKENS = 8
+
+_EMPTY = np.iinfo(np.uint64).max
+
+
+def normalize_name(name):
+    """snake_case form of a column name, so "CustomerId", "customer id" and "customer_id" agree"""
+    name = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", str(name))
+    return "_".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def _trigrams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _hash_tokens(tokens):
+    return pd.util.hash_array(np.array(sorted(tokens), dtype=object), categorize=False)
+
+
+class SchemaSignature:
+    """MinHash signature of a dataset's columns, plus one descriptor per column.
+
+    The dataset signature is built over tokens for every column: its
+    normalized name, name trigrams, name with type, the type (counted, so
+    three date columns differ from one) and a few slots of the column's value
+    MinHash. Renamed columns still share type and value tokens, and daily
+    partitions share names and types even when their values differ.
+    """
+
+    def __init__(self, columns, hashvalues):
+        self.columns = columns
+        self.hashvalues = hashvalues
+
+    @classmethod
+    def from_dataframe(cls, df, column_types, sample_rows=5000, seed=0):
+        sample = df if len(df) <= sample_rows else df.sample(n=sample_rows, random_state=seed)
+        return cls.from_columns([
+            {
+                "name": str(column),
+                "key": normalize_name(column),
+                "type": column_types.get(column, "unknown"),
+                "values": MinHash(VALUE_PERM).update(hash_series(sample[column])).hashvalues
+            }
+            for column in df.columns
+        ])
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Signature over column descriptors: name, key (normalized name), type and a VALUE_PERM value MinHash"""
+        tokens = set()
+        type_counts = {}
+        for column in columns:
+            key, column_type, values = column["key"], column["type"], column["values"]
+            type_counts[column_type] = type_counts.get(column_type, 0) + 1
+            tokens.update([f"name:{key}", f"column:{key}:{column_type}",
+                           f"type:{column_type}:{type_counts[column_type]}"])
+            tokens.update(f"gram:{gram}" for gram in _trigrams(key))
+            if values[0] != _EMPTY:
+                tokens.update(f"value:{slot}:{value}" for slot, value in enumerate(values[:VALUE_TOKENS].tolist()))
+        return cls(columns, MinHash(NUM_PERM).update(_hash_tokens(tokens)).hashvalues)
+
+
+def _column_score(stored, new):
+    """How likely two columns of the same type are the same column: by name or by values"""
+    stored_grams, new_grams = _trigrams(stored["key"]), _trigrams(new["key"])
+    name_score = len(stored_grams & new_grams) / len(stored_grams | new_grams)
+    empty = stored["values"][0] == _EMPTY or new["values"][0] == _EMPTY
+    value_score = 0.0 if empty else float(np.mean(stored["values"] == new["values"]))
+    return max(name_score, value_score)
+
+
+def match_columns(stored_columns, new_columns, min_score=0.6):
+    """{stored column name: new column name}; types must agree.
+
+    Equal normalized names pair up first, then the remaining columns are
+    paired greedily by name-trigram or value similarity.
+    """
+    mapping = {}
+    used = set()
+    by_key = {(column["key"], column["type"]): column["name"] for column in reversed(new_columns)}
+    for stored in stored_columns:
+        name = by_key.get((stored["key"], stored["type"]))
+        if name is not None and name not in used:
+            mapping[stored["name"]] = name
+            used.add(name)
+
+    pairs = []
+    for i, stored in enumerate(stored_columns):
+        if stored["name"] in mapping:
+            continue
+        for j, new in enumerate(new_columns):
+            if new["name"] not in used and new["type"] == stored["type"]:
+                score = _column_score(stored, new)
+                if score >= min_score:
+                    pairs.append((-score, i, j))
+    for _, i, j in sorted(pairs):
+        stored, new = stored_columns[i]["name"], new_columns[j]["name"]
+        if stored not in mapping and new not in used:
+            mapping[stored] = new
+            used.add(new)
+    return mapping
+
+
+def remap_rules(rules, mapping):
+    """Stored rules (RuleSet.to_dict() shape) rewritten to the new column names.
+
+    Rules on a column the new dataset does not have are dropped; returns
+    (rules, dropped count). Renames are applied to the columns, the rule text
+    and the pseudo SQL in one pass, so swapped names do not collide.
+    """
+    renames = {old: new for old, new in mapping.items() if old != new}
+    pattern = re.compile(
+        r"(?<!\w)(" + "|".join(re.escape(old) for old in sorted(renames, key=len, reverse=True)) + r")(?!\w)"
+    ) if renames else None
+
+    def rename(text):
+        return pattern.sub(lambda match: renames[match.group(1)], text) if pattern and text else text
+
+    remapped = {}
+    dropped = 0
+    for category, rule_list in rules.items():
+        kept = []
+        for raw in rule_list:
+            if not isinstance(raw, dict):
+                kept.append(rename(raw))
+                continue
+            columns_key = "columns_involved" if "columns_involved" in raw else "columns"
+            columns = raw.get(columns_key) or []
+            columns = [columns] if isinstance(columns, str) else columns
+            if any(column not in mapping for column in columns):
+                dropped += 1
+                continue
+            raw = dict(raw, **{columns_key: [mapping[column] for column in columns]})
+            raw["rule"] = rename(raw.get("rule"))
+            if raw.get("pseudo_sql"):
+                raw["pseudo_sql"] = rename(raw["pseudo_sql"])
+            kept.append(raw)
+        remapped[category] = kept
+    return remapped, dropped
+
+
+class SchemaMatch:
+    """A stored rule set close enough to reuse, remapped to the new dataset"""
+
+    def __init__(self, entry_id, name, similarity, column_mapping, new_columns, rules, dropped_rules):
+        self.entry_id = entry_id
+        self.name = name
+        self.similarity = similarity
+        self.column_mapping = column_mapping
+        self.new_columns = new_columns
+        self.rules = rules
+        self.dropped_rules = dropped_rules
+
+    @property
+    def reused_rules(self):
+        return sum(len(rule_list) for rule_list in self.rules.values())
+
+    def to_dict(self):
+        return {
+            "entry_id": self.entry_id,
+            "name": self.name,
+            "similarity": self.similarity,
+            "column_mapping": self.column_mapping,
+            "new_columns": self.new_columns,
+            "reused_rules": self.reused_rules,
+            "dropped_rules": self.dropped_rules
+        }
+
+
+class SchemaIndex:
+    """Local index of generated rule sets, searched by schema similarity.
+
+    Each entry is a dataset signature (see SchemaSignature) plus the rules
+    generated for it. Signatures are banded for LSH: every band hashes to one
+    key, and datasets sharing any band key become candidates, so a lookup is
+    BANDS dict probes and an exact signature comparison against the few
+    candidates, however many entries are stored.
+
+    On disk, under <root>/: signatures.bin holds the raw signatures back to
+    back, entries.jsonl one summary line per entry, and entries/<id>.json the
+    column descriptors and rules, which are only read for the best match.
+
+    One index is shared by every session of the app, so add() and lookups
+    hold a lock: an add grows the signature buffer and the bucket lists,
+    which a concurrent lookup must not see half done.
+    """
+
+    def __init__(self, root=None, bands=BANDS, min_similarity=0.5, min_column_score=0.6):
+        if NUM_PERM % bands:
+            raise ValueError(f"bands must divide the signature length {NUM_PERM}")
+        self.root = root or os.environ.get("DQ_SCHEMA_INDEX_DIR", DEFAULT_INDEX_DIR)
+        self.bands = bands
+        self.min_similarity = min_similarity
+        self.min_column_score = min_column_score
+        self.entries = []
+        # Grown by doubling; rows past len(self.entries) are unused
+        self._signatures = np.empty((0, NUM_PERM), dtype=np.uint64)
+        self._buckets = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, signature, rules, name=None):
+        """Store a rule set (RuleSet or its dict form) under the signature; returns the entry id"""
+        rules = rules.to_dict() if hasattr(rules, "to_dict") else rules
+        entry = {
+            "entry_id": uuid.uuid4().hex,
+            "name": name,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        os.makedirs(os.path.join(self.root, "entries"), exist_ok=True)
+        path = os.path.join(self.root, "entries", f"{entry['entry_id']}.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                **entry,
+                "columns": [{**column, "values": column["values"].tolist()} for column in signature.columns],
+                "rules": rules
+            }, f)
+        os.replace(path + ".tmp", path)
+
+        # The summary line goes last: an entry counts once it is in entries.jsonl
+        hashvalues = np.asarray(signature.hashvalues, dtype=np.uint64).reshape(1, NUM_PERM)
+        with self._lock:
+            with open(os.path.join(self.root, "signatures.bin"), "ab") as f:
+                f.write(hashvalues.astype("<u8").tobytes())
+            with open(os.path.join(self.root, "entries.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._insert([entry], hashvalues)
+        return entry["entry_id"]
+
+    def nearest(self, signature):
+        """(entry position, estimated Jaccard similarity) of the closest LSH candidate, or None"""
+        keys = self._band_keys(np.asarray(signature.hashvalues, dtype=np.uint64).reshape(1, NUM_PERM))[0].tolist()
+        candidates = set()
+        with self._lock:
+            for buckets, key in zip(self._buckets, keys):
+                candidates.update(buckets.get(key, ()))
+            if not candidates:
+                return None
+            candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            stored = self._signatures[candidates]
+        similarities = (stored == signature.hashvalues).mean(axis=1)
+        best = int(np.argmax(similarities))
+        return int(candidates[best]), float(similarities[best])
+
+    def lookup(self, signature):
+        """The closest stored rule set remapped to the signature's columns, or None if none is close enough"""
+        nearest = self.nearest(signature)
+        if nearest is None or nearest[1] < self.min_similarity:
+            return None
+        position, similarity = nearest
+        with self._lock:
+            entry_id = self.entries[position]["entry_id"]
+        stored = self.read_entry(entry_id)
+        stored_columns = [{**column, "values": np.array(column["values"], dtype=np.uint64)}
+                          for column in stored["columns"]]
+        mapping = match_columns(stored_columns, signature.columns, self.min_column_score)
+        rules, dropped = remap_rules(stored["rules"], mapping)
+        mapped = set(mapping.values())
+        return SchemaMatch(
+            stored["entry_id"],
+            stored.get("name"),
+            similarity,
+            mapping,
+            [column["name"] for column in signature.columns if column["name"] not in mapped],
+            rules,
+            dropped
+        )
+
+    def read_entry(self, entry_id):
+        with open(os.path.join(self.root, "entries", f"{entry_id}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _band_keys(self, signatures):
+        """One 64-bit key per band: the band's values folded through the SplitMix64 mixer"""
+        bands = signatures.reshape(len(signatures), self.bands, NUM_PERM // self.bands)
+        keys = np.zeros(bands.shape[:2], dtype=np.uint64)
+        for row in range(bands.shape[2]):
+            keys = _mix64(keys ^ bands[:, :, row])
+        return keys
+
+    def _insert(self, entries, signatures):
+        start = len(self.entries)
+        self.entries.extend(entries)
+        if len(self.entries) > len(self._signatures):
+            grown = np.empty((max(len(self.entries), 2 * len(self._signatures), 64), NUM_PERM), dtype=np.uint64)
+            grown[:start] = self._signatures[:start]
+            self._signatures = grown
+        self._signatures[start:len(self.entries)] = signatures
+        keys = self._band_keys(signatures)
+        for band, buckets in enumerate(self._buckets):
+            for position, key in enumerate(keys[:, band].tolist(), start):
+                buckets.setdefault(key, []).append(position)
+
+    def _load(self):
+        entries_path = os.path.join(self.root, "entries.jsonl")
+        if not os.path.exists(entries_path):
+            return
+        with open(entries_path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        signatures_path = os.path.join(self.root, "signatures.bin")
+        signatures = np.fromfile(signatures_path, dtype="<u8").astype(np.uint64)
+        signatures = signatures[:len(signatures) // NUM_PERM * NUM_PERM].reshape(-1, NUM_PERM)
+        count = min(len(entries), len(signatures))
+        if os.path.getsize(signatures_path) > count * NUM_PERM * 8:
+            # A write cut short left a signature without its summary line; drop
+            # it so the next signature appended lines up with its entry again
+            os.truncate(signatures_path, count * NUM_PERM * 8)
+        self._insert(entries[:count], signatures[:count])
@@ -0,0 +1,210 @@
+import csv
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from utils.rule_executor import iter_executable_rules
+
+UNION_PREFIX_COLUMNS = ["rule_id", "category"]
+UNION_PREFIX_LEN = len(UNION_PREFIX_COLUMNS)
+UNION_EXTRA_COLUMN = "extra"
+
+
+class _CSVPartWriter:
+    def __init__(self, path, columns):
+        self.path = path
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, columns, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetPartWriter:
+    def __init__(self, path, columns):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self._pq = pq
+        self._writer = None
+        self._schema = None
+
+    def write(self, columns, rows):
+        import pyarrow as pa
+
+        values = list(zip(*rows)) if rows else [[] for _ in columns]
+        if self._schema is None:
+            table = pa.table({column: list(column_values) for column, column_values in zip(columns, values)})
+            self._schema = table.schema
+            self._writer = self._pq.ParquetWriter(self.path, self._schema)
+        else:
+            arrays = [pa.array(list(column_values), type=field.type)
+                      for column_values, field in zip(values, self._schema)]
+            table = pa.Table.from_arrays(arrays, schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _PartitionedWriter:
+    """Spread a stream of row chunks over numbered part files of bounded size."""
+
+    def __init__(self, directory, file_format, rows_per_file):
+        self.directory = directory
+        self.file_format = file_format
+        self.rows_per_file = rows_per_file
+        self.files = []
+        self._writer = None
+        self._columns = None
+        self._rows_in_file = 0
+
+    def _open(self, columns):
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"part-{len(self.files):05d}.{self.file_format}")
+        writer_class = _ParquetPartWriter if self.file_format == "parquet" else _CSVPartWriter
+        self._writer = writer_class(path, columns)
+        self._columns = columns
+        self._rows_in_file = 0
+        self.files.append(path)
+
+    def write(self, columns, rows):
+        while rows:
+            if self._writer is None or self._columns != columns or self._rows_in_file >= self.rows_per_file:
+                self._open(columns)
+            batch = rows[:self.rows_per_file - self._rows_in_file]
+            try:
+                self._writer.write(columns, batch)
+            except Exception:
+                # Parquet parts keep the schema of their first chunk; a chunk whose
+                # values no longer fit it (e.g. all-null first chunk) starts a new part
+                if self.file_format != "parquet" or self._rows_in_file == 0:
+                    raise
+                self._open(columns)
+                self._writer.write(columns, batch)
+            self._rows_in_file += len(batch)
+            rows = rows[len(batch):]
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class ViolationExporter:
+    """Stream the rows violating each rule into chunked CSV or Parquet files.
+
+    Rows are fetched from the RuleExecutor cursor one chunk at a time and
+    written straight to disk, so memory stays bounded by the chunk size
+    regardless of how many rows violate a rule.
+    """
+
+    def __init__(self, rule_executor, output_dir, file_format="csv", chunk_size=50000,
+                 max_rows_per_rule=None, rows_per_file=1000000):
+        if file_format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported export format: {file_format}")
+        if file_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError as e:
+                raise ImportError("Parquet export requires pyarrow (pip install pyarrow)") from e
+        self.rule_executor = rule_executor
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.chunk_size = chunk_size
+        self.max_rows_per_rule = max_rows_per_rule
+        self.rows_per_file = rows_per_file
+
+    def export(self, rules, mode="per_rule"):
+        """Run every rule and write its violations; returns the export manifest.
+
+        mode="per_rule" writes one directory of part files per rule, while
+        mode="union" writes a single stream tagged with rule_id and category.
+        """
+        if mode not in ("per_rule", "union"):
+            raise ValueError(f"Unsupported export mode: {mode}")
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        manifest = {
+            "generated_at": datetime.now().isoformat(),
+            "format": self.file_format,
+            "mode": mode,
+            "max_rows_per_rule": self.max_rows_per_rule,
+            "rules": {}
+        }
+
+        union_writer = None
+        if mode == "union":
+            self._union_columns = self._build_union_columns()
+            union_writer = _PartitionedWriter(
+                os.path.join(self.output_dir, "violations"), self.file_format, self.rows_per_file
+            )
+
+        try:
+            for rule_id, category, rule in iter_executable_rules(rules):
+                writer = union_writer or _PartitionedWriter(
+                    os.path.join(self.output_dir, rule_id), self.file_format, self.rows_per_file
+                )
+                entry = {"category": category, "rule": rule.text, "violating_rows": 0}
+                try:
+                    for columns, rows in self.rule_executor.iter_violations(
+                        rule, chunk_size=self.chunk_size, max_rows=self.max_rows_per_rule
+                    ):
+                        if union_writer is not None:
+                            columns, rows = self._to_union_rows(rule_id, category, columns, rows)
+                        writer.write(columns, rows)
+                        entry["violating_rows"] += len(rows)
+                except sqlite3.Error as e:
+                    entry["error"] = str(e)
+                finally:
+                    if union_writer is None:
+                        writer.close()
+                        entry["files"] = writer.files
+
+                entry["capped"] = (self.max_rows_per_rule is not None
+                                   and entry["violating_rows"] >= self.max_rows_per_rule)
+                manifest["rules"][rule_id] = entry
+        finally:
+            if union_writer is not None:
+                union_writer.close()
+                manifest["files"] = union_writer.files
+
+        with open(os.path.join(self.output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def _build_union_columns(self):
+        base_columns = []
+        for columns in self.rule_executor.tables.values():
+            base_columns.extend(column for column in columns if column not in base_columns)
+        return UNION_PREFIX_COLUMNS + base_columns + [UNION_EXTRA_COLUMN]
+
+    def _to_union_rows(self, rule_id, category, columns, rows):
+        """Project a rule's result rows onto the shared union layout.
+
+        Result columns that are not table columns (e.g. COUNT(*) from a
+        uniqueness check) are kept as a JSON object in the extra column.
+        """
+        union_columns = self._union_columns
+        positions = {column: index for index, column in enumerate(union_columns)}
+        union_rows = []
+        for row in rows:
+            union_row = [None] * len(union_columns)
+            union_row[:UNION_PREFIX_LEN] = (rule_id, category)
+            extra = {}
+            for column, value in zip(columns, row):
+                position = positions.get(column)
+                if position is not None and UNION_PREFIX_LEN <= position < len(union_columns) - 1:
+                    union_row[position] = value
+                else:
+                    extra[column] = value
+            union_row[-1] = json.dumps(extra, default=str) if extra else None
+            union_rows.append(tuple(union_row))
+        return union_columns, union_rows